@@ -47,6 +47,9 @@ class BufferManager:
         self.checkpoint_content: str | None = None
         self.checkpoint_anchor_index: int | None = None
         self._checkpoint_task: asyncio.Task[str] | None = None
+        # Set whenever no checkpoint is in flight; cleared while one runs
+        self.checkpoint_done = asyncio.Event()
+        self.checkpoint_done.set()
         # Persists after swap for dashboard visibility
         self.last_checkpoint_content: str | None = None
         self._last_swap_messages: list[dict[str, Any]] = []
@@ -277,6 +280,7 @@ class BufferManager:
         )
         await self._notify_state_change()
 
+        self.checkpoint_done.clear()
         self._checkpoint_task = asyncio.create_task(
             run_checkpoint(
                 http_client=http_client,
@@ -320,6 +324,7 @@ class BufferManager:
                 self.conv_id, "checkpoint_failed",
             )
             self._checkpoint_task = None
+            self.checkpoint_done.set()
             await self._notify_state_change()
             return
 
@@ -328,6 +333,7 @@ class BufferManager:
             self.phase, BufferPhase.WAL_ACTIVE,
             self.conv_id, "checkpoint_complete",
         )
+        self.checkpoint_done.set()
         await self._notify_state_change()
         log.info(
             "wal_started",
@@ -443,6 +449,7 @@ class BufferManager:
             if self._checkpoint_task and not self._checkpoint_task.done():
                 self._checkpoint_task.cancel()
             self._checkpoint_task = None
+            self.checkpoint_done.set()
 
             if old_phase != BufferPhase.IDLE:
                 self.phase = transition(
@@ -37,6 +37,14 @@ class BufferPhase(enum.Enum):
     SWAP_READY = "SWAP_READY"
     SWAP_EXECUTING = "SWAP_EXECUTING"
 
+    # Dense 0..n-1 position, used to address the transition bitmask
+    index: int
+
+
+for _position, _phase in enumerate(BufferPhase):
+    _phase.index = _position
+del _position, _phase
+
 
 # Valid transitions: (from_phase, to_phase)
 VALID_TRANSITIONS: set[tuple[BufferPhase, BufferPhase]] = {
@@ -55,6 +63,15 @@ VALID_TRANSITIONS: set[tuple[BufferPhase, BufferPhase]] = {
     (BufferPhase.SWAP_EXECUTING, BufferPhase.IDLE),
 }
 
+# VALID_TRANSITIONS packed into one int: bit (from.index * stride + to.index)
+# is set iff the transition is allowed. Checked on every phase change, and a
+# shift-and-mask is cheaper than hashing a tuple of enum members.
+_TRANSITION_STRIDE = len(BufferPhase)
+_TRANSITION_MASK = 0
+for _from, _to in VALID_TRANSITIONS:
+    _TRANSITION_MASK |= 1 << (_from.index * _TRANSITION_STRIDE + _to.index)
+del _from, _to
+
 
 class InvalidTransition(Exception):
     """Raised when an invalid phase transition is attempted."""
@@ -67,7 +84,7 @@ class InvalidTransition(Exception):
 
 def validate_transition(from_phase: BufferPhase, to_phase: BufferPhase) -> None:
     """Validate a phase transition, raising InvalidTransition if not allowed."""
-    if (from_phase, to_phase) not in VALID_TRANSITIONS:
+    if not _TRANSITION_MASK >> (from_phase.index * _TRANSITION_STRIDE + to_phase.index) & 1:
         raise InvalidTransition(from_phase, to_phase)
 
 
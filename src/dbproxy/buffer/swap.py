@@ -12,8 +12,10 @@ the swap point.
 from __future__ import annotations
 
 import json
+from collections.abc import Callable
 from typing import Any
 
+import orjson
 import structlog
 
 from dbproxy.proxy.response_builder import (
@@ -54,6 +56,53 @@ def _summarize_tool_result(block: dict[str, Any]) -> str:
     return f"{prefix} {result_content}"
 
 
+def _serialize_tool_use(block: dict[str, Any]) -> str:
+    name = block.get("name", "?")
+    inp = block.get("input", {})
+    # Show key args concisely
+    brief = ""
+    if isinstance(inp, dict):
+        # Try common arg names for a brief summary
+        for key in ("file_path", "path", "pattern", "command", "query", "url"):
+            val = inp.get(key)
+            if val and isinstance(val, str):
+                brief = val
+                break
+        if not brief:
+            # Fallback: compact JSON of input
+            brief = json.dumps(inp, separators=(",", ":"))
+        if len(brief) > 150:
+            brief = brief[:150] + "..."
+    if brief:
+        return f"[tool_use: {name}({brief})]"
+    return f"[tool_use: {name}]"
+
+
+# Content block type → WAL serializer; unknown types fall back to a
+# "[<type> block]" placeholder.
+_BLOCK_SERIALIZERS: dict[str, Callable[[dict[str, Any]], str]] = {
+    "text": lambda block: block.get("text", ""),
+    "tool_use": _serialize_tool_use,
+    "tool_result": _summarize_tool_result,
+    "compaction": lambda block: "[prior compaction summary]",
+}
+
+
+def _serialize_block(block: Any) -> str:
+    if isinstance(block, str):
+        return block
+    if not isinstance(block, dict):
+        return str(block)
+    block_type = block.get("type")
+    serializer = _BLOCK_SERIALIZERS.get(block_type) if isinstance(block_type, str) else None
+    if serializer is None:
+        return f"[{block.get('type', 'unknown')} block]"
+    return serializer(block)
+
+
+_ROLE_PREFIXES = {role: f"[{role}]\n" for role in ("user", "assistant")}
+
+
 def _serialize_message(msg: dict[str, Any]) -> str:
     """Serialize a single message dict for WAL inclusion.
 
@@ -63,49 +112,15 @@ def _serialize_message(msg: dict[str, Any]) -> str:
     """
     role = msg.get("role", "unknown")
     content = msg.get("content", "")
+    prefix = _ROLE_PREFIXES.get(role) or f"[{role}]\n"
 
     if isinstance(content, str):
-        return f"[{role}]\n{content}"
+        return prefix + content
 
     if isinstance(content, list):
-        parts: list[str] = []
-        for block in content:
-            if isinstance(block, str):
-                parts.append(block)
-            elif not isinstance(block, dict):
-                parts.append(str(block))
-            elif block.get("type") == "text":
-                parts.append(block.get("text", ""))
-            elif block.get("type") == "tool_use":
-                name = block.get("name", "?")
-                inp = block.get("input", {})
-                # Show key args concisely
-                brief = ""
-                if isinstance(inp, dict):
-                    # Try common arg names for a brief summary
-                    for key in ("file_path", "path", "pattern", "command", "query", "url"):
-                        val = inp.get(key)
-                        if val and isinstance(val, str):
-                            brief = val
-                            break
-                    if not brief:
-                        # Fallback: compact JSON of input
-                        brief = json.dumps(inp, separators=(",", ":"))
-                    if len(brief) > 150:
-                        brief = brief[:150] + "..."
-                if brief:
-                    parts.append(f"[tool_use: {name}({brief})]")
-                else:
-                    parts.append(f"[tool_use: {name}]")
-            elif block.get("type") == "tool_result":
-                parts.append(_summarize_tool_result(block))
-            elif block.get("type") == "compaction":
-                parts.append("[prior compaction summary]")
-            else:
-                parts.append(f"[{block.get('type', 'unknown')} block]")
-        return f"[{role}]\n" + "\n".join(parts)
-
-    return f"[{role}]\n{str(content)}"
+        return prefix + "\n".join([_serialize_block(block) for block in content])
+
+    return prefix + str(content)
 
 
 def format_compaction_with_wal(
@@ -132,7 +147,7 @@ def format_compaction_with_wal(
     ]
 
     if wal_messages:
-        serialized = "\n\n".join(_serialize_message(msg) for msg in wal_messages)
+        serialized = "\n\n".join([_serialize_message(msg) for msg in wal_messages])
         parts.append("")
         parts.append(
             "The following conversation continued after the summary above was generated. "
@@ -189,10 +204,7 @@ def serialize_swap_response_bytes(
     """Serialize a swap response to bytes for sending to the client."""
     if stream:
         assert isinstance(response, list)
-        parts: list[bytes] = []
-        for event in response:
-            parts.append(event.to_bytes())
-        return b"".join(parts)
+        return b"".join([part for event in response for part in event.to_bytes_parts()])
     else:
         assert isinstance(response, dict)
-        return json.dumps(response).encode()
+        return orjson.dumps(response)
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -13,6 +15,7 @@ class ProxyConfig(BaseSettings):
     swap_threshold: float = 0.80
     max_sse_buffer_bytes: int = 50_000_000  # 50 MB
     db_path: str = "data/dbproxy.sqlite"
+    db_backend: Literal["sqlite", "null"] = "sqlite"  # "null" persists nothing
     log_dir: str = "logs"
     log_level: str = "DEBUG"
     conversation_ttl_seconds: int = 7200
@@ -14,6 +14,7 @@ across all requests in that conversation.
 
 from __future__ import annotations
 
+import functools
 import hashlib
 import json
 import re
@@ -38,41 +39,71 @@ def _extract_session_id(body: dict[str, Any]) -> str | None:
     if not isinstance(metadata, dict):
         return None
     user_id = metadata.get("user_id")
-    if not isinstance(user_id, str):
+    # Substring check short-circuits user_ids without a session component
+    # before they reach the regex (or take up a cache slot).
+    if not isinstance(user_id, str) or "_session_" not in user_id:
         return None
+    return _session_id_from_user_id(user_id)
+
+
+# Every request in a conversation carries the same user_id, so the regex
+# lookup is memoized (a pure function of the short user_id string).
+@functools.lru_cache(maxsize=1024)
+def _session_id_from_user_id(user_id: str) -> str | None:
     m = _SESSION_RE.search(user_id)
     return m.group(1) if m else None
 
 
+def _sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _json_list_prefix(items: list[Any], limit: int) -> str:
+    """Return ``json.dumps(items, sort_keys=True)[:limit]``.
+
+    Blocks are encoded one at a time and encoding stops once the prefix
+    is long enough, so a large system prompt isn't serialized in full
+    just to keep its first ``limit`` characters.
+    """
+    out = "["
+    for i, item in enumerate(items):
+        if len(out) >= limit:
+            return out[:limit]
+        out += (", " if i else "") + json.dumps(item, sort_keys=True)
+    return (out + "]")[:limit]
+
+
 def _fallback_fingerprint(body: dict[str, Any]) -> str:
     """Compute a fingerprint from system prompt prefix + first user message.
 
     Used when metadata.user_id is not available.
     """
-    parts: list[str] = []
-
     # System prompt (prefix only — tail may change between requests)
     system = body.get("system")
-    if system is not None:
-        if isinstance(system, str):
-            parts.append(system[:SYSTEM_PREFIX_LENGTH])
-        elif isinstance(system, list):
-            serialized = json.dumps(system, sort_keys=True)
-            parts.append(serialized[:SYSTEM_PREFIX_LENGTH])
+    system_part: str | None = None
+    if isinstance(system, str):
+        system_part = system[:SYSTEM_PREFIX_LENGTH]
+    elif isinstance(system, list):
+        system_part = _json_list_prefix(system, SYSTEM_PREFIX_LENGTH)
 
     # First user message
-    messages = body.get("messages", [])
-    for msg in messages:
+    content_part: str | None = None
+    for msg in body.get("messages", []):
         if msg.get("role") == "user":
             content = msg.get("content", "")
             if isinstance(content, str):
-                parts.append(content)
+                content_part = content
             elif isinstance(content, list):
-                parts.append(json.dumps(content, sort_keys=True))
+                content_part = json.dumps(content, sort_keys=True)
             break
 
-    combined = "\n---\n".join(parts)
-    return hashlib.sha256(combined.encode()).hexdigest()
+    # Same text as joining the present parts with the separator, without
+    # building an intermediate list for the common single/two-part shapes.
+    if system_part is None:
+        return _sha256_hex(content_part or "")
+    if content_part is None:
+        return _sha256_hex(system_part)
+    return _sha256_hex(f"{system_part}\n---\n{content_part}")
 
 
 def compute_fingerprint(body: dict[str, Any]) -> str:
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import time
+from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING
 
 import structlog
@@ -16,10 +17,19 @@ log = structlog.get_logger()
 class ConversationRegistry:
     """Thread-safe registry mapping conversation fingerprints to buffer managers."""
 
-    def __init__(self, ttl_seconds: int = 7200) -> None:
+    def __init__(
+        self,
+        ttl_seconds: int = 7200,
+        state_change_cb: Callable[[BufferManager], Awaitable[None]] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self._conversations: dict[str, BufferManager] = {}
         self._last_seen: dict[str, float] = {}
         self._ttl = ttl_seconds
+        # Only used for TTL bookkeeping, so a monotonic clock is enough
+        self._clock = clock
+        # Installed on every newly created manager (dashboard broadcasts)
+        self._state_change_cb = state_change_cb
 
     def get_or_create(self, fingerprint: str, model: str, context_window: int) -> "BufferManager":
         """Get an existing conversation or create a new one.
@@ -30,7 +40,7 @@ class ConversationRegistry:
         from dbproxy.buffer.manager import BufferManager
 
         key = f"{fingerprint}:{model}"
-        self._last_seen[key] = time.time()
+        self._last_seen[key] = self._clock()
 
         if key in self._conversations:
             return self._conversations[key]
@@ -40,6 +50,8 @@ class ConversationRegistry:
             model=model,
             context_window=context_window,
         )
+        if self._state_change_cb is not None:
+            mgr.set_state_change_callback(self._state_change_cb)
         self._conversations[key] = mgr
         log.info("conversation_registered", conv_id=fingerprint[:16], model=model)
         return mgr
@@ -48,7 +60,7 @@ class ConversationRegistry:
         """Get an existing conversation by prefix match, or None."""
         for key, mgr in self._conversations.items():
             if key.startswith(fingerprint):
-                self._last_seen[key] = time.time()
+                self._last_seen[key] = self._clock()
                 return mgr
         return None
 
@@ -59,9 +71,14 @@ class ConversationRegistry:
             self._conversations.pop(k, None)
             self._last_seen.pop(k, None)
 
+    def clear(self) -> None:
+        """Remove every conversation from the registry."""
+        self._conversations.clear()
+        self._last_seen.clear()
+
     def expire_stale(self) -> list[str]:
         """Remove conversations older than TTL. Returns list of expired keys."""
-        now = time.time()
+        now = self._clock()
         expired = [
             key for key, ts in self._last_seen.items()
             if now - ts > self._ttl
@@ -54,6 +54,20 @@ def _build_upstream_headers(request: web.Request, body_bytes: bytes) -> dict[str
     return headers
 
 
+def _buffer_headers(mgr: BufferManager) -> dict[str, str]:
+    """Response headers describing the conversation's buffer state.
+
+    x-double-buffer-fingerprint carries the full conversation fingerprint
+    so clients (and tests) can look the conversation up without
+    recomputing it from the request body.
+    """
+    return {
+        "x-double-buffer-phase": mgr.phase.value,
+        "x-double-buffer-conv-id": mgr.conv_id[:16],
+        "x-double-buffer-fingerprint": mgr.conv_id,
+    }
+
+
 def _is_suggestion_request(body: dict[str, Any]) -> bool:
     """Detect Claude Code suggestion-mode requests.
 
@@ -94,6 +108,16 @@ class MessageHandler:
         self.registry = registry
         self.broadcaster = broadcaster
 
+    def manager_for(self, body: dict[str, Any], model: str) -> BufferManager:
+        """Return the conversation's manager, configured from proxy config."""
+        fingerprint = compute_fingerprint(body)
+        context_window = self.config.context_window_for(model)
+        mgr = self.registry.get_or_create(fingerprint, model, context_window)
+        mgr.checkpoint_threshold = self.config.checkpoint_threshold
+        mgr.swap_threshold = self.config.swap_threshold
+        mgr.compact_trigger_tokens = self.config.compact_trigger_tokens
+        return mgr
+
     async def handle(self, request: web.Request) -> web.StreamResponse:
         """Handle a POST /v1/messages request."""
         body_bytes = await request.read()
@@ -128,12 +152,8 @@ class MessageHandler:
                 metadata_keys=sorted(raw_metadata.keys()),
                 user_id=str(raw_metadata.get("user_id", ""))[:80],
             )
-        fingerprint = compute_fingerprint(body)
-        context_window = self.config.context_window_for(model)
-        mgr = self.registry.get_or_create(fingerprint, model, context_window)
-        mgr.checkpoint_threshold = self.config.checkpoint_threshold
-        mgr.swap_threshold = self.config.swap_threshold
-        mgr.compact_trigger_tokens = self.config.compact_trigger_tokens
+        mgr = self.manager_for(body, model)
+        fingerprint = mgr.conv_id
 
         # Log message structure for debugging compaction behavior
         messages = metadata["messages"]
@@ -384,8 +404,7 @@ class MessageHandler:
                 headers={
                     "content-type": "text/event-stream",
                     "cache-control": "no-cache",
-                    "x-double-buffer-phase": mgr.phase.value,
-                    "x-double-buffer-conv-id": mgr.conv_id[:16],
+                    **_buffer_headers(mgr),
                 },
             )
             await client_response.prepare(original_request)
@@ -453,10 +472,7 @@ class MessageHandler:
             body=upstream_response.content,
             status=upstream_response.status_code,
             content_type="application/json",
-            headers={
-                "x-double-buffer-phase": mgr.phase.value,
-                "x-double-buffer-conv-id": mgr.conv_id[:16],
-            },
+            headers=_buffer_headers(mgr),
         )
 
     def _send_synthetic_response(
@@ -484,8 +500,5 @@ class MessageHandler:
             body=response_bytes,
             status=200,
             content_type=content_type,
-            headers={
-                "x-double-buffer-phase": mgr.phase.value,
-                "x-double-buffer-conv-id": mgr.conv_id[:16],
-            },
+            headers=_buffer_headers(mgr),
         )
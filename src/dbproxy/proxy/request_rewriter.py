@@ -14,6 +14,7 @@ import structlog
 log = structlog.get_logger()
 
 COMPACT_EDIT_TYPE = "compact_20260112"
+COMPACTION_BLOCK_TYPE = "compaction"
 
 
 def strip_compact_edit(body: dict[str, Any]) -> dict[str, Any]:
@@ -36,9 +37,11 @@ def strip_compact_edit(body: dict[str, Any]) -> dict[str, Any]:
         # No compact edit found, return as-is
         return body
 
-    result = copy.deepcopy(body)
+    # Shallow copy: only context_management changes, so messages, tools
+    # and system are shared with the original body.
+    result = dict(body)
     if filtered:
-        result["context_management"]["edits"] = filtered
+        result["context_management"] = {**ctx_mgmt, "edits": filtered}
     else:
         del result["context_management"]
 
@@ -55,8 +58,10 @@ def has_compact_edit(body: dict[str, Any]) -> bool:
     ctx_mgmt = body.get("context_management")
     if not ctx_mgmt:
         return False
-    edits = ctx_mgmt.get("edits", [])
-    return any(e.get("type") == COMPACT_EDIT_TYPE for e in edits)
+    for edit in ctx_mgmt.get("edits", ()):
+        if edit.get("type") == COMPACT_EDIT_TYPE:
+            return True
+    return False
 
 
 # Marker text that Claude Code includes in compaction prompts.
@@ -99,13 +104,14 @@ def has_compaction_block(body: dict[str, Any]) -> bool:
     This indicates the client already has a compaction — we should
     reset conversation state to IDLE.
     """
-    messages = body.get("messages", [])
-    for msg in messages:
+    for msg in body.get("messages", ()):
         content = msg.get("content")
-        if isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict) and block.get("type") == "compaction":
-                    return True
+        if not isinstance(content, list):
+            # Plain string content (the common case) can't hold a block
+            continue
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == COMPACTION_BLOCK_TYPE:
+                return True
     return False
 
 
@@ -122,7 +128,7 @@ def strip_compaction_blocks(body: dict[str, Any]) -> dict[str, Any]:
         content = msg.get("content")
         if isinstance(content, list):
             for block in content:
-                if isinstance(block, dict) and block.get("type") == "compaction":
+                if isinstance(block, dict) and block.get("type") == COMPACTION_BLOCK_TYPE:
                     has_any = True
                     break
         if has_any:
@@ -136,7 +142,7 @@ def strip_compaction_blocks(body: dict[str, Any]) -> dict[str, Any]:
         content = msg.get("content")
         if isinstance(content, list):
             for i, block in enumerate(content):
-                if isinstance(block, dict) and block.get("type") == "compaction":
+                if isinstance(block, dict) and block.get("type") == COMPACTION_BLOCK_TYPE:
                     # Convert to text block — preserves the summary for the model
                     compaction_text = block.get("content", "")
                     content[i] = {
@@ -6,13 +6,19 @@ compaction block, mimicking the native Anthropic API compaction response.
 
 from __future__ import annotations
 
-import json
 import time
 from typing import Any
 
+import orjson
+
 from .sse_parser import SSEEvent
 
 
+def _dumps(data: dict[str, Any]) -> str:
+    # SSE data lines are text; orjson escapes newlines like json.dumps does
+    return orjson.dumps(data).decode()
+
+
 def generate_message_id() -> str:
     """Generate a msg_ prefixed ID."""
     import hashlib
@@ -64,7 +70,7 @@ def build_compaction_sse_events(
     events = [
         SSEEvent(
             event="message_start",
-            data=json.dumps({
+            data=_dumps({
                 "type": "message_start",
                 "message": {
                     "id": msg_id,
@@ -80,7 +86,7 @@ def build_compaction_sse_events(
         ),
         SSEEvent(
             event="content_block_start",
-            data=json.dumps({
+            data=_dumps({
                 "type": "content_block_start",
                 "index": 0,
                 "content_block": {"type": "text", "text": ""},
@@ -88,7 +94,7 @@ def build_compaction_sse_events(
         ),
         SSEEvent(
             event="content_block_delta",
-            data=json.dumps({
+            data=_dumps({
                 "type": "content_block_delta",
                 "index": 0,
                 "delta": {"type": "text_delta", "text": compaction_content},
@@ -96,14 +102,14 @@ def build_compaction_sse_events(
         ),
         SSEEvent(
             event="content_block_stop",
-            data=json.dumps({
+            data=_dumps({
                 "type": "content_block_stop",
                 "index": 0,
             }),
         ),
         SSEEvent(
             event="message_delta",
-            data=json.dumps({
+            data=_dumps({
                 "type": "message_delta",
                 "delta": {"stop_reason": "end_turn", "stop_sequence": None},
                 "usage": {"output_tokens": output_tokens},
@@ -111,7 +117,7 @@ def build_compaction_sse_events(
         ),
         SSEEvent(
             event="message_stop",
-            data=json.dumps({"type": "message_stop"}),
+            data=_dumps({"type": "message_stop"}),
         ),
     ]
 
@@ -6,7 +6,9 @@ information and forwarding events to the client in real-time.
 
 from __future__ import annotations
 
+import codecs
 import json
+from collections.abc import Callable
 from typing import Any
 
 import structlog
@@ -30,6 +32,15 @@ class SSEForwarder:
         self._accumulated_text: str = ""
         self._has_compaction: bool = False
         self._message_data: dict[str, Any] = {}
+        # Event type → handler; one dict lookup per event instead of an
+        # if/elif chain of string compares.
+        self._handlers: dict[str, Callable[[dict[str, Any]], None]] = {
+            "message_start": self._on_message_start,
+            "content_block_start": self._on_content_block_start,
+            "content_block_delta": self._on_content_block_delta,
+            "content_block_stop": self._on_content_block_stop,
+            "message_delta": self._on_message_delta,
+        }
 
     @property
     def has_compaction(self) -> bool:
@@ -46,45 +57,48 @@ class SSEForwarder:
         except (json.JSONDecodeError, ValueError):
             return event
 
-        event_type = data.get("type", "")
-
-        if event_type == "message_start":
-            msg = data.get("message", {})
-            self._message_data = msg
-            self.usage = msg.get("usage", {})
-
-        elif event_type == "content_block_start":
-            block = data.get("content_block", {})
-            self._current_block = block
-            if block.get("type") == "compaction":
-                self._has_compaction = True
-
-        elif event_type == "content_block_delta":
-            delta = data.get("delta", {})
-            delta_type = delta.get("type", "")
-            if delta_type == "text_delta":
-                self._accumulated_text += delta.get("text", "")
-            elif delta_type == "compaction_delta":
-                self._has_compaction = True
-
-        elif event_type == "content_block_stop":
-            if self._current_block:
-                if self._current_block.get("type") == "text":
-                    self._current_block["text"] = self._accumulated_text
-                self.content_blocks.append(self._current_block)
-                self._current_block = None
-                self._accumulated_text = ""
-
-        elif event_type == "message_delta":
-            delta = data.get("delta", {})
-            if "stop_reason" in delta:
-                self.stop_reason = delta["stop_reason"]
-            usage = data.get("usage", {})
-            if usage:
-                self.usage.update(usage)
+        handler = self._handlers.get(data.get("type", ""))
+        if handler is not None:
+            handler(data)
 
         return event
 
+    def _on_message_start(self, data: dict[str, Any]) -> None:
+        msg = data.get("message", {})
+        self._message_data = msg
+        self.usage = msg.get("usage", {})
+
+    def _on_content_block_start(self, data: dict[str, Any]) -> None:
+        block = data.get("content_block", {})
+        self._current_block = block
+        if block.get("type") == "compaction":
+            self._has_compaction = True
+
+    def _on_content_block_delta(self, data: dict[str, Any]) -> None:
+        delta = data.get("delta", {})
+        delta_type = delta.get("type", "")
+        if delta_type == "text_delta":
+            self._accumulated_text += delta.get("text", "")
+        elif delta_type == "compaction_delta":
+            self._has_compaction = True
+
+    def _on_content_block_stop(self, data: dict[str, Any]) -> None:
+        block = self._current_block
+        if block:
+            if block.get("type") == "text":
+                block["text"] = self._accumulated_text
+            self.content_blocks.append(block)
+            self._current_block = None
+            self._accumulated_text = ""
+
+    def _on_message_delta(self, data: dict[str, Any]) -> None:
+        delta = data.get("delta", {})
+        if "stop_reason" in delta:
+            self.stop_reason = delta["stop_reason"]
+        usage = data.get("usage", {})
+        if usage:
+            self.usage.update(usage)
+
     async def forward_stream(
         self,
         response_stream: Any,
@@ -93,34 +107,41 @@ class SSEForwarder:
     ) -> None:
         """Forward an upstream SSE stream to the client, processing events.
 
+        Upstream chunks are written to the client verbatim — they already
+        carry correct SSE framing — and parsed separately only to extract
+        usage and compaction metadata.
+
         Args:
-            response_stream: An async iterator of SSE text chunks from upstream.
+            response_stream: An async iterator of SSE byte chunks from upstream.
             client_response: The aiohttp StreamResponse to write to.
             max_buffer_bytes: Maximum bytes to buffer before raising.
         """
         total_bytes = 0
+        # Incremental decoder so multi-byte characters split across chunks
+        # are reassembled rather than replaced.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
 
         async for chunk in response_stream:
             if isinstance(chunk, bytes):
-                text = chunk.decode("utf-8", errors="replace")
+                raw = chunk
+                text = decoder.decode(chunk)
             else:
+                raw = chunk.encode()
                 text = chunk
 
-            events = self.parser.feed(text)
-            for event in events:
-                processed = self.process_event(event)
-                event_bytes = processed.to_bytes()
-                total_bytes += len(event_bytes)
-
-                if total_bytes > max_buffer_bytes:
-                    log.error(
-                        "sse_buffer_overflow",
-                        conv_id=self.conv_id[:16],
-                        total_bytes=total_bytes,
-                    )
-                    raise RuntimeError(f"SSE buffer overflow: {total_bytes} bytes")
-
-                await client_response.write(event_bytes)
+            total_bytes += len(raw)
+            if total_bytes > max_buffer_bytes:
+                log.error(
+                    "sse_buffer_overflow",
+                    conv_id=self.conv_id[:16],
+                    total_bytes=total_bytes,
+                )
+                raise RuntimeError(f"SSE buffer overflow: {total_bytes} bytes")
+
+            await client_response.write(raw)
+
+            for event in self.parser.feed(text):
+                self.process_event(event)
 
         log.debug(
             "sse_stream_complete",
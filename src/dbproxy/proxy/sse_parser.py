@@ -8,7 +8,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class SSEEvent:
     """A single Server-Sent Event."""
 
@@ -21,20 +21,28 @@ class SSEEvent:
     def is_empty(self) -> bool:
         return not self.event and not self.data
 
-    def to_bytes(self) -> bytes:
-        """Serialize back to SSE wire format."""
-        lines: list[str] = []
+    def to_bytes_parts(self) -> list[bytes]:
+        """Wire-format pieces of this event, in order, for ``b"".join``.
+
+        Lets a run of events be joined into one exactly sized buffer
+        instead of growing a bytearray.
+        """
+        parts: list[bytes] = []
         if self.event:
-            lines.append(f"event: {self.event}")
+            parts += (b"event: ", self.event.encode(), b"\n")
         if self.data:
             for data_line in self.data.split("\n"):
-                lines.append(f"data: {data_line}")
+                parts += (b"data: ", data_line.encode(), b"\n")
         if self.id:
-            lines.append(f"id: {self.id}")
+            parts += (b"id: ", self.id.encode(), b"\n")
         if self.retry is not None:
-            lines.append(f"retry: {self.retry}")
-        lines.append("")  # blank line terminates event
-        return ("\n".join(lines) + "\n").encode()
+            parts.append(b"retry: %d\n" % self.retry)
+        parts.append(b"\n")  # blank line terminates event
+        return parts
+
+    def to_bytes(self) -> bytes:
+        """Serialize back to SSE wire format."""
+        return b"".join(self.to_bytes_parts())
 
 
 @dataclass
@@ -43,42 +51,51 @@ class SSEParser:
 
     _buffer: str = ""
     _current: SSEEvent = field(default_factory=SSEEvent)
+    # data: lines of the event being built, joined once at dispatch
+    _data_lines: list[str] = field(default_factory=list)
 
     def feed(self, chunk: str) -> list[SSEEvent]:
         """Feed a chunk of text, return any complete events."""
-        self._buffer += chunk
+        buffer = self._buffer + chunk if self._buffer else chunk
         events: list[SSEEvent] = []
 
-        while "\n" in self._buffer:
-            line, self._buffer = self._buffer.split("\n", 1)
-            line = line.rstrip("\r")
+        # Split every complete line in one C-level pass; only the trailing
+        # partial line is kept for the next chunk. (str.split, not
+        # splitlines: SSE only breaks on \n / \r\n, and data may contain
+        # other Unicode line separators.)
+        end = buffer.rfind("\n")
+        if end == -1:
+            self._buffer = buffer
+            return events
+        self._buffer = buffer[end + 1:]
+
+        for line in buffer[:end].split("\n"):
+            if line.endswith("\r"):
+                line = line[:-1]
 
             if not line:
                 # Blank line = event dispatch
-                if not self._current.is_empty:
-                    events.append(self._current)
-                self._current = SSEEvent()
+                self._dispatch(events)
                 continue
 
-            if line.startswith(":"):
+            if line[0] == ":":
                 # Comment, ignore
                 continue
 
-            if ":" in line:
-                field_name, _, value = line.partition(":")
-                if value.startswith(" "):
-                    value = value[1:]
-            else:
-                field_name = line
-                value = ""
+            # data: dominates Anthropic streams, so check it first
+            if line.startswith("data:"):
+                value = line[5:]
+                self._data_lines.append(value[1:] if value[:1] == " " else value)
+                continue
+
+            field_name, sep, value = line.partition(":")
+            if sep and value[:1] == " ":
+                value = value[1:]
 
             if field_name == "event":
                 self._current.event = value
             elif field_name == "data":
-                if self._current.data:
-                    self._current.data += "\n" + value
-                else:
-                    self._current.data = value
+                self._data_lines.append(value)
             elif field_name == "id":
                 self._current.id = value
             elif field_name == "retry":
@@ -88,3 +105,12 @@ class SSEParser:
                     pass
 
         return events
+
+    def _dispatch(self, events: list[SSEEvent]) -> None:
+        current = self._current
+        if self._data_lines:
+            current.data = "\n".join(self._data_lines)
+            self._data_lines.clear()
+        if not current.is_empty:
+            events.append(current)
+        self._current = SSEEvent()
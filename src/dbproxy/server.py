@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import ssl
@@ -10,6 +11,7 @@ from typing import Any
 import dns.resolver
 import httpcore
 import httpx
+import orjson
 import structlog
 from aiohttp import web
 
@@ -17,27 +19,58 @@ from .config import ProxyConfig
 from .dashboard.broadcaster import Broadcaster
 from .dashboard.ws_handler import websocket_handler
 from .identity.registry import ConversationRegistry
-from .proxy.handler import MessageHandler
-from .store.db import Database
+from .proxy.handler import MessageHandler, _build_upstream_headers
+from .store.db import Database, NullDatabase
 from .tls import create_server_ssl_context, generate_certs
 
 log = structlog.get_logger()
 
+# Upstream response headers that must not be relayed to the client.
+# httpx already decodes the body, so content-encoding/content-length
+# would describe bytes we no longer send.
+_HOP_HEADERS = frozenset({
+    "transfer-encoding",
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "upgrade",
+    "content-encoding",
+    "content-length",
+})
+
+
+def _resolve_upstream_ip_sync(hostname: str) -> str:
+    """Blocking DNS query for the upstream host via public resolvers."""
+    resolver = dns.resolver.Resolver()
+    resolver.nameservers = ["8.8.8.8", "1.1.1.1"]
+    answers = resolver.resolve(hostname, "A")
+    return str(answers[0])
+
 
-def resolve_upstream_ip(hostname: str = "api.anthropic.com") -> str:
+async def resolve_upstream_ip(hostname: str = "api.anthropic.com") -> str:
     """Resolve the real IP of the upstream API, bypassing /etc/hosts.
 
     Uses an explicit DNS query to Google/Cloudflare DNS to get the real IP
-    even when /etc/hosts maps the hostname to 127.0.0.1.
+    even when /etc/hosts maps the hostname to 127.0.0.1.  The query runs
+    in a worker thread so it never blocks the event loop.
     """
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = ["8.8.8.8", "1.1.1.1"]
-    answers = resolver.resolve(hostname, "A")
-    ip = str(answers[0])
+    ip = await asyncio.to_thread(_resolve_upstream_ip_sync, hostname)
     log.info("upstream_ip_resolved", hostname=hostname, ip=ip)
     return ip
 
 
+def _json_response(data: Any, status: int = 200) -> web.Response:
+    """JSON response serialized with orjson (detail payloads can be large)."""
+    return web.Response(
+        body=orjson.dumps(data),
+        status=status,
+        content_type="application/json",
+    )
+
+
 class _DNSOverrideBackend(httpcore.AsyncNetworkBackend):
     """Network backend that overrides DNS for specific hostnames.
 
@@ -92,8 +125,7 @@ async def create_app(
         # Resolve upstream IP (bypassing /etc/hosts via external DNS)
         dns_overrides: dict[str, str] = {}
         try:
-            upstream_ip = resolve_upstream_ip(upstream_host)
-            dns_overrides[upstream_host] = upstream_ip
+            dns_overrides[upstream_host] = await resolve_upstream_ip(upstream_host)
         except Exception:
             log.warning("dns_resolution_failed_using_direct", upstream_url=config.upstream_url)
 
@@ -111,14 +143,25 @@ async def create_app(
             follow_redirects=True,
         )
 
-    # Conversation registry
-    app["registry"] = ConversationRegistry(ttl_seconds=config.conversation_ttl_seconds)
-
     # Dashboard broadcaster
-    app["broadcaster"] = Broadcaster()
+    broadcaster = Broadcaster()
+    app["broadcaster"] = broadcaster
+
+    async def on_state_change(mgr: Any) -> None:
+        await broadcaster.broadcast_state(mgr)
+
+    app["on_state_change"] = on_state_change
+
+    # Conversation registry — wires the broadcaster into each new manager
+    app["registry"] = ConversationRegistry(
+        ttl_seconds=config.conversation_ttl_seconds,
+        state_change_cb=on_state_change,
+    )
 
     # Database
-    db = Database(config.db_path)
+    db: Database | NullDatabase = (
+        Database(config.db_path) if config.db_backend == "sqlite" else NullDatabase()
+    )
     app["db"] = db
 
     # Message handler
@@ -130,15 +173,6 @@ async def create_app(
     )
     app["message_handler"] = handler
 
-    # Wire up broadcaster to buffer managers
-    broadcaster = app["broadcaster"]
-
-    async def on_state_change(mgr: Any) -> None:
-        await broadcaster.broadcast_state(mgr)
-
-    # Store callback factory for new conversations
-    app["on_state_change"] = on_state_change
-
     # Routes
     app.router.add_post("/v1/messages", handle_messages)
     app.router.add_get("/health", handle_health)
@@ -164,7 +198,7 @@ async def create_app(
 
 async def on_startup(app: web.Application) -> None:
     """Initialize resources on startup."""
-    db: Database = app["db"]
+    db: Database | NullDatabase = app["db"]
     await db.connect()
     log.info("server_started", config=app["config"].model_dump())
 
@@ -172,7 +206,7 @@ async def on_startup(app: web.Application) -> None:
 async def on_cleanup(app: web.Application) -> None:
     """Clean up resources on shutdown."""
     await app["http_client"].aclose()
-    db: Database = app["db"]
+    db: Database | NullDatabase = app["db"]
     await db.close()
     log.info("server_stopped")
 
@@ -180,28 +214,13 @@ async def on_cleanup(app: web.Application) -> None:
 async def handle_messages(request: web.Request) -> web.StreamResponse:
     """POST /v1/messages — main proxy endpoint."""
     handler: MessageHandler = request.app["message_handler"]
-
-    # Register state change callback for new conversations
-    # (done here so the registry has it for newly created managers)
-    orig_get_or_create = request.app["registry"].get_or_create
-
-    def patched_get_or_create(fp: str, model: str, cw: int) -> Any:
-        mgr = orig_get_or_create(fp, model, cw)
-        if mgr._on_state_change is None:
-            mgr.set_state_change_callback(request.app["on_state_change"])
-        return mgr
-
-    request.app["registry"].get_or_create = patched_get_or_create  # type: ignore[assignment]
-    try:
-        return await handler.handle(request)
-    finally:
-        request.app["registry"].get_or_create = orig_get_or_create  # type: ignore[assignment]
+    return await handler.handle(request)
 
 
 async def handle_health(request: web.Request) -> web.Response:
     """GET /health — health check endpoint."""
     registry: ConversationRegistry = request.app["registry"]
-    return web.json_response({
+    return _json_response({
         "status": "ok",
         "conversations": len(registry),
         "passthrough": request.app["config"].passthrough,
@@ -222,12 +241,12 @@ async def handle_reset(request: web.Request) -> web.Response:
         for fp, mgr in registry.all_conversations().items():
             if fp.startswith(conv_id):
                 await mgr.reset("api_reset")
-                return web.json_response({"status": "reset", "conv_id": conv_id})
-        return web.json_response({"error": "conversation not found"}, status=404)
+                return _json_response({"status": "reset", "conv_id": conv_id})
+        return _json_response({"error": "conversation not found"}, status=404)
     else:
         for mgr in registry.all_conversations().values():
             await mgr.reset("api_reset_all")
-        return web.json_response({"status": "reset_all", "count": len(registry)})
+        return _json_response({"status": "reset_all", "count": len(registry)})
 
 
 async def handle_conversation_detail(request: web.Request) -> web.Response:
@@ -239,8 +258,8 @@ async def handle_conversation_detail(request: web.Request) -> web.Response:
     registry: ConversationRegistry = request.app["registry"]
     for reg_key, mgr in registry.all_conversations().items():
         if reg_key == key or reg_key.startswith(key):
-            return web.json_response(mgr.to_detail_dict())
-    return web.json_response({"error": "conversation not found"}, status=404)
+            return _json_response(mgr.to_detail_dict())
+    return _json_response({"error": "conversation not found"}, status=404)
 
 
 async def handle_dashboard(request: web.Request) -> web.FileResponse:
@@ -257,7 +276,6 @@ async def _passthrough_to_upstream(
     http_client: httpx.AsyncClient = request.app["http_client"]
 
     body = await request.read()
-    from dbproxy.proxy.handler import _build_upstream_headers
     headers = _build_upstream_headers(request, body)
 
     # Preserve query string
@@ -272,14 +290,13 @@ async def _passthrough_to_upstream(
             content=body if body else None,
             timeout=120.0,
         )
-        # Filter out hop-by-hop headers from upstream response
-        safe_headers = {
-            k: v for k, v in resp.headers.items()
-            if k.lower() not in (
-                "transfer-encoding", "connection", "keep-alive",
-                "content-encoding", "content-length",
-            )
-        }
+        # Filter out hop-by-hop headers from upstream response.
+        # multi_items() yields lowercased keys and keeps repeated headers
+        # (e.g. set-cookie) as separate entries.
+        safe_headers = [
+            (k, v) for k, v in resp.headers.multi_items()
+            if k not in _HOP_HEADERS
+        ]
         return web.Response(
             body=resp.content,
             status=resp.status_code,
@@ -308,8 +325,6 @@ async def handle_api_passthrough(request: web.Request) -> web.Response:
 
 def run_server(config: ProxyConfig | None = None) -> None:
     """Run the proxy server (blocking)."""
-    import asyncio
-
     if config is None:
         config = ProxyConfig()
 
@@ -2,18 +2,64 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import os
 import time
+from collections.abc import Iterable, Sequence
+from dataclasses import fields
 from typing import Any
 
 import aiosqlite
+import orjson
 import structlog
 
-from .models import SCHEMA_SQL, ConversationRow, EventRow
+from .models import SCHEMA_SQL, SCHEMA_VERSION, ConversationRow, EventRow
 
 log = structlog.get_logger()
 
+# SQL is kept as module constants so every call passes the identical
+# string and hits sqlite3's per-connection prepared-statement cache.
+_SQL_UPSERT_CONVERSATION = """
+    INSERT INTO conversations
+        (fingerprint, model, context_window, phase, total_input_tokens,
+         checkpoint_content, checkpoint_anchor_index, wal_start_index,
+         created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(fingerprint) DO UPDATE SET
+        phase = excluded.phase,
+        total_input_tokens = excluded.total_input_tokens,
+        checkpoint_content = excluded.checkpoint_content,
+        checkpoint_anchor_index = excluded.checkpoint_anchor_index,
+        wal_start_index = excluded.wal_start_index,
+        updated_at = excluded.updated_at
+"""
+_SQL_GET_CONVERSATION = "SELECT * FROM conversations WHERE fingerprint = ?"
+_SQL_LIST_CONVERSATIONS = "SELECT * FROM conversations ORDER BY updated_at DESC"
+_CONVERSATION_COLUMNS = tuple(f.name for f in fields(ConversationRow))
+_SQL_DELETE_MESSAGES = "DELETE FROM messages WHERE fingerprint = ?"
+_SQL_DELETE_CONVERSATION = "DELETE FROM conversations WHERE fingerprint = ?"
+_SQL_LOG_EVENT = (
+    "INSERT INTO events (fingerprint, event_type, payload_json, created_at) VALUES (?, ?, ?, ?)"
+)
+_SQL_RECENT_EVENTS_FOR = (
+    "SELECT * FROM events WHERE fingerprint = ? ORDER BY created_at DESC LIMIT ?"
+)
+_SQL_RECENT_EVENTS = "SELECT * FROM events ORDER BY created_at DESC LIMIT ?"
+
+# log_event() calls arriving within this window share one executemany +
+# commit instead of paying a worker-thread hop and commit each.
+_EVENT_FLUSH_DELAY = 0.01
+
+
+def _encode_payload(payload: dict[str, Any] | None) -> str | None:
+    # payload_json is a TEXT column; orjson output is compact JSON
+    return orjson.dumps(payload).decode() if payload else None
+
+
+def _log_flush_failure(task: asyncio.Task[None]) -> None:
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        log.error("db_event_flush_failed", error=str(exc))
+
 
 class Database:
     """Async SQLite database for persisting conversation state."""
@@ -21,20 +67,54 @@ class Database:
     def __init__(self, db_path: str) -> None:
         self._db_path = db_path
         self._conn: aiosqlite.Connection | None = None
+        self._event_buffer: list[tuple[str | None, str, str | None, float]] = []
+        self._flush_task: asyncio.Task[None] | None = None
+        # Held for the whole swap + executemany + commit, so a flush that
+        # finds the buffer empty still waits for rows another is writing.
+        self._flush_lock = asyncio.Lock()
 
     async def connect(self) -> None:
-        """Open database connection and initialize schema."""
-        os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
-        self._conn = await aiosqlite.connect(self._db_path)
+        """Open database connection and initialize schema.
+
+        ``db_path`` may be a filesystem path, a ``file:`` URI, or
+        ``:memory:``. The latter opens a named shared-cache in-memory
+        database, so other connections in this process can attach to it
+        by URI while this one is open.
+        """
+        if self._db_path == ":memory:":
+            target, uri = f"file:dbproxy_mem_{id(self):x}?mode=memory&cache=shared", True
+        elif self._db_path.startswith("file:"):
+            target, uri = self._db_path, True
+        else:
+            os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            target, uri = self._db_path, False
+        # Every statement below is a module constant, so a 256-entry cache
+        # keeps all of them prepared for the life of the connection.
+        self._conn = await aiosqlite.connect(target, uri=uri, cached_statements=256)
+        # WAL + synchronous=NORMAL: readers don't block the writer and
+        # commits skip the per-transaction fsync (still crash-safe in WAL).
         await self._conn.execute("PRAGMA journal_mode=WAL")
+        await self._conn.execute("PRAGMA synchronous=NORMAL")
+        await self._conn.execute("PRAGMA cache_size=-20000")
+        await self._conn.execute("PRAGMA temp_store=MEMORY")
+        # Transactions here are a few rows; keep dirty pages in cache until commit
+        await self._conn.execute("PRAGMA cache_spill=OFF")
+        await self._conn.execute("PRAGMA busy_timeout=5000")
         await self._conn.execute("PRAGMA foreign_keys=ON")
-        await self._conn.executescript(SCHEMA_SQL)
+        cursor = await self._conn.execute("PRAGMA user_version")
+        (version,) = await cursor.fetchone()
+        if version < SCHEMA_VERSION:
+            await self._conn.executescript(SCHEMA_SQL)
+            await self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
         await self._conn.commit()
         log.info("db_connected", path=self._db_path)
 
     async def close(self) -> None:
-        """Close database connection."""
+        """Close database connection, flushing any queued events first."""
+        await self._wait_flush_task()
+        self._flush_task = None
         if self._conn:
+            await self.flush_events()
             await self._conn.close()
             self._conn = None
 
@@ -58,20 +138,7 @@ class Database:
         """Insert or update a conversation record."""
         now = time.time()
         await self.conn.execute(
-            """
-            INSERT INTO conversations
-                (fingerprint, model, context_window, phase, total_input_tokens,
-                 checkpoint_content, checkpoint_anchor_index, wal_start_index,
-                 created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(fingerprint) DO UPDATE SET
-                phase = excluded.phase,
-                total_input_tokens = excluded.total_input_tokens,
-                checkpoint_content = excluded.checkpoint_content,
-                checkpoint_anchor_index = excluded.checkpoint_anchor_index,
-                wal_start_index = excluded.wal_start_index,
-                updated_at = excluded.updated_at
-            """,
+            _SQL_UPSERT_CONVERSATION,
             (
                 fingerprint, model, context_window, phase, total_input_tokens,
                 checkpoint_content, checkpoint_anchor_index, wal_start_index,
@@ -83,8 +150,7 @@ class Database:
     async def get_conversation(self, fingerprint: str) -> ConversationRow | None:
         """Fetch a conversation by fingerprint."""
         cursor = await self.conn.execute(
-            "SELECT * FROM conversations WHERE fingerprint = ?",
-            (fingerprint,),
+            _SQL_GET_CONVERSATION, (fingerprint,),
         )
         row = await cursor.fetchone()
         if row is None:
@@ -93,20 +159,34 @@ class Database:
 
     async def list_conversations(self) -> list[ConversationRow]:
         """List all conversations."""
+        cursor = await self.conn.execute(_SQL_LIST_CONVERSATIONS)
+        rows = await cursor.fetchall()
+        return [ConversationRow(*r) for r in rows]
+
+    async def list_conversations_columnar(
+        self, columns: Sequence[str] = _CONVERSATION_COLUMNS,
+    ) -> dict[str, list[Any]]:
+        """List all conversations as a column name → values mapping.
+
+        Selects only the requested columns and skips building a
+        ConversationRow per row, for callers that scan a few fields
+        across every conversation.
+        """
+        unknown = set(columns) - set(_CONVERSATION_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown conversation columns: {sorted(unknown)}")
         cursor = await self.conn.execute(
-            "SELECT * FROM conversations ORDER BY updated_at DESC"
+            f"SELECT {', '.join(columns)} FROM conversations ORDER BY updated_at DESC"
         )
         rows = await cursor.fetchall()
-        return [ConversationRow(*r) for r in rows]
+        if not rows:
+            return {name: [] for name in columns}
+        return {name: list(values) for name, values in zip(columns, zip(*rows))}
 
     async def delete_conversation(self, fingerprint: str) -> None:
         """Delete a conversation and its messages."""
-        await self.conn.execute(
-            "DELETE FROM messages WHERE fingerprint = ?", (fingerprint,)
-        )
-        await self.conn.execute(
-            "DELETE FROM conversations WHERE fingerprint = ?", (fingerprint,)
-        )
+        await self.conn.execute(_SQL_DELETE_MESSAGES, (fingerprint,))
+        await self.conn.execute(_SQL_DELETE_CONVERSATION, (fingerprint,))
         await self.conn.commit()
 
     async def log_event(
@@ -115,26 +195,120 @@ class Database:
         fingerprint: str | None = None,
         payload: dict[str, Any] | None = None,
     ) -> None:
-        """Log a timestamped event."""
-        await self.conn.execute(
-            "INSERT INTO events (fingerprint, event_type, payload_json, created_at) VALUES (?, ?, ?, ?)",
-            (fingerprint, event_type, json.dumps(payload) if payload else None, time.time()),
+        """Queue a timestamped event.
+
+        Events are written in batches shortly after they are queued; reads
+        through get_recent_events() flush first, so they always see them.
+        """
+        self._event_buffer.append(
+            (fingerprint, event_type, _encode_payload(payload), time.time())
         )
-        await self.conn.commit()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_events_later())
+            self._flush_task.add_done_callback(_log_flush_failure)
+
+    async def log_events_batch(
+        self,
+        events: Iterable[tuple[str, str | None, dict[str, Any] | None]],
+    ) -> None:
+        """Write (event_type, fingerprint, payload) events in one transaction."""
+        now = time.time()
+        self._event_buffer.extend(
+            (fingerprint, event_type, _encode_payload(payload), now)
+            for event_type, fingerprint, payload in events
+        )
+        await self.flush_events()
+
+    async def flush_events(self) -> None:
+        """Write all queued events with a single executemany + commit.
+
+        Returns once every event queued before the call is committed,
+        including any a concurrent flush had already taken.
+        """
+        async with self._flush_lock:
+            if not self._event_buffer:
+                return
+            rows, self._event_buffer = self._event_buffer, []
+            await self.conn.executemany(_SQL_LOG_EVENT, rows)
+            await self.conn.commit()
+
+    async def _flush_events_later(self) -> None:
+        await asyncio.sleep(_EVENT_FLUSH_DELAY)
+        await self.flush_events()
+
+    async def _wait_flush_task(self) -> None:
+        """Let a pending background flush finish rather than cut it off.
+
+        Its failure, if any, is already logged by _log_flush_failure.
+        """
+        task = self._flush_task
+        if task is not None and not task.done():
+            await asyncio.gather(task, return_exceptions=True)
 
     async def get_recent_events(
         self, fingerprint: str | None = None, limit: int = 100
     ) -> list[EventRow]:
         """Fetch recent events, optionally filtered by conversation."""
+        await self._wait_flush_task()
+        await self.flush_events()
         if fingerprint:
             cursor = await self.conn.execute(
-                "SELECT * FROM events WHERE fingerprint = ? ORDER BY created_at DESC LIMIT ?",
-                (fingerprint, limit),
+                _SQL_RECENT_EVENTS_FOR, (fingerprint, limit),
             )
         else:
-            cursor = await self.conn.execute(
-                "SELECT * FROM events ORDER BY created_at DESC LIMIT ?",
-                (limit,),
-            )
+            cursor = await self.conn.execute(_SQL_RECENT_EVENTS, (limit,))
         rows = await cursor.fetchall()
         return [EventRow(*r) for r in rows]
+
+
+class NullDatabase:
+    """Drop-in for Database that persists nothing.
+
+    Used when ``db_backend="null"`` (tests, throwaway runs): connect() opens
+    no SQLite connection, writes are discarded and reads come back empty.
+    """
+
+    async def connect(self) -> None:
+        log.info("db_connected", path=None, backend="null")
+
+    async def close(self) -> None:
+        pass
+
+    async def upsert_conversation(self, fingerprint: str, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def get_conversation(self, fingerprint: str) -> ConversationRow | None:
+        return None
+
+    async def list_conversations(self) -> list[ConversationRow]:
+        return []
+
+    async def list_conversations_columnar(
+        self, columns: Sequence[str] = _CONVERSATION_COLUMNS,
+    ) -> dict[str, list[Any]]:
+        return {name: [] for name in columns}
+
+    async def delete_conversation(self, fingerprint: str) -> None:
+        pass
+
+    async def log_event(
+        self,
+        event_type: str,
+        fingerprint: str | None = None,
+        payload: dict[str, Any] | None = None,
+    ) -> None:
+        pass
+
+    async def log_events_batch(
+        self,
+        events: Iterable[tuple[str, str | None, dict[str, Any] | None]],
+    ) -> None:
+        pass
+
+    async def flush_events(self) -> None:
+        pass
+
+    async def get_recent_events(
+        self, fingerprint: str | None = None, limit: int = 100
+    ) -> list[EventRow]:
+        return []
@@ -5,6 +5,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
+# Stored in PRAGMA user_version once SCHEMA_SQL has been applied; bump
+# whenever SCHEMA_SQL changes so existing databases re-run it.
+SCHEMA_VERSION = 1
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS conversations (
     fingerprint TEXT PRIMARY KEY,
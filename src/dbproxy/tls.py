@@ -6,6 +6,8 @@ can terminate TLS locally. Uses trustme for programmatic cert generation.
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import os
 import ssl
 
@@ -17,25 +19,39 @@ log = structlog.get_logger()
 CA_CERT_FILE = "ca.pem"
 SERVER_CERT_FILE = "server.pem"
 SERVER_KEY_FILE = "server.key"
+SYSTEM_CA_DEST = "/usr/local/share/ca-certificates/dbproxy-ca.crt"
 
 
 def generate_certs(ca_dir: str) -> tuple[str, str, str]:
     """Generate CA + server cert for api.anthropic.com if not already present.
 
+    Results are memoized per ``ca_dir`` — repeat calls in the same process
+    return the resolved paths without touching the filesystem.
+
     Returns (ca_path, cert_path, key_path).
     """
+    return _resolve_certs(ca_dir)
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_certs(ca_dir: str) -> tuple[str, str, str]:
     os.makedirs(ca_dir, exist_ok=True)
     ca_path = os.path.join(ca_dir, CA_CERT_FILE)
     cert_path = os.path.join(ca_dir, SERVER_CERT_FILE)
     key_path = os.path.join(ca_dir, SERVER_KEY_FILE)
 
-    if os.path.exists(ca_path) and os.path.exists(cert_path) and os.path.exists(key_path):
+    # One directory read instead of three stat calls
+    with os.scandir(ca_dir) as it:
+        present = {entry.name for entry in it}
+    if {CA_CERT_FILE, SERVER_CERT_FILE, SERVER_KEY_FILE} <= present:
         log.info("tls_certs_exist", ca_dir=ca_dir)
         return ca_path, cert_path, key_path
 
     log.info("tls_generating_certs", ca_dir=ca_dir)
-    ca = trustme.CA()
-    server_cert = ca.issue_cert("api.anthropic.com")
+    # ECDSA P-256 keygen is sub-millisecond (RSA-2048 takes hundreds of ms)
+    # and is accepted by every TLS client we proxy for, unlike Ed25519.
+    ca = trustme.CA(key_type=trustme.KeyType.ECDSA)
+    server_cert = ca.issue_cert("api.anthropic.com", key_type=trustme.KeyType.ECDSA)
 
     # Write CA cert
     ca.cert_pem.write_to_path(ca_path)
@@ -43,8 +59,7 @@ def generate_certs(ca_dir: str) -> tuple[str, str, str]:
     # Write server cert + key
     # trustme stores cert chain as multiple blobs, key as one
     with open(cert_path, "wb") as f:
-        for blob in server_cert.cert_chain_pems:
-            f.write(blob.bytes())
+        f.write(b"".join(blob.bytes() for blob in server_cert.cert_chain_pems))
 
     server_cert.private_key_pem.write_to_path(key_path)
 
@@ -53,23 +68,44 @@ def generate_certs(ca_dir: str) -> tuple[str, str, str]:
 
 
 def create_server_ssl_context(cert_path: str, key_path: str) -> ssl.SSLContext:
-    """Create an SSL context for the proxy server."""
+    """Create an SSL context for the proxy server.
+
+    Contexts are cached on the cert file's mtime, so callers share one
+    context (and its session cache) until the cert is rotated on disk.
+    """
+    return _build_server_ssl_context(cert_path, key_path, os.path.getmtime(cert_path))
+
+
+@functools.lru_cache(maxsize=4)
+def _build_server_ssl_context(cert_path: str, key_path: str, mtime: float) -> ssl.SSLContext:
     ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     ctx.load_cert_chain(cert_path, key_path)
     ctx.minimum_version = ssl.TLSVersion.TLSv1_2
     return ctx
 
 
+def _file_sha256(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").digest()
+
+
 def install_ca_system_trust(ca_path: str) -> None:
     """Install the CA certificate into the system trust store.
 
     Requires root. Copies CA cert to /usr/local/share/ca-certificates/
-    and runs update-ca-certificates.
+    and runs update-ca-certificates. Skipped when the installed copy is
+    already identical, since update-ca-certificates rehashes the whole
+    trust store.
     """
     import shutil
     import subprocess
 
-    dest = "/usr/local/share/ca-certificates/dbproxy-ca.crt"
+    dest = SYSTEM_CA_DEST
+    if os.path.exists(dest) and _file_sha256(dest) == _file_sha256(ca_path):
+        log.info("tls_ca_already_installed", dest=dest)
+        return
+
+    # copy2 already uses sendfile() on Linux
     shutil.copy2(ca_path, dest)
     subprocess.run(["update-ca-certificates"], check=True)
     log.info("tls_ca_installed_system", dest=dest)
@@ -0,0 +1,126 @@
+"""Long-lived tmux control-mode client shared by the E2E scripts.
+
+Commands are written to a ``tmux -C`` client's stdin and answered in
+%begin/%end blocks on stdout, so polling the pane costs a pipe round-trip
+instead of a fork/exec. The no-output and ignore-size flags keep it from
+receiving pane output or resizing the session. If it dies, callers fall
+back to one-shot tmux subprocesses.
+
+Imported as a top-level module: the scripts run as ``python tests/<script>.py``,
+which puts ``tests/`` on sys.path.
+"""
+
+from __future__ import annotations
+
+import subprocess
+
+
+def quote(text: str) -> str:
+    """Quote text as a single tmux argument with no expansion or escapes.
+
+    Control-mode commands are newline-terminated, so embedded newlines
+    become double-quoted "\\n" escapes between single-quoted runs.
+    """
+    return '"\\n"'.join("'" + part.replace("'", "'\\''") + "'" for part in text.split("\n"))
+
+
+def _read_ctl_block(proc: subprocess.Popen) -> tuple[bool, list[str]] | None:
+    """Read the next %begin..%end/%error reply, skipping notifications.
+
+    Returns (ok, output_lines), or None if the control client exited.
+    """
+    assert proc.stdout is not None
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            return None
+        if not line.startswith("%begin "):
+            continue  # asynchronous notification
+        guard = line.split()[1:3]  # time + command number
+        body: list[str] = []
+        while True:
+            line = proc.stdout.readline()
+            if not line:
+                return None
+            parts = line.split()
+            if parts[:1] in (["%end"], ["%error"]) and parts[1:3] == guard:
+                return parts[0] == "%end", body
+            body.append(line.rstrip("\n"))
+
+
+class TmuxControl:
+    """Control-mode connection to one tmux session, attached on first use."""
+
+    def __init__(self, session: str) -> None:
+        self.session = session
+        self._proc: subprocess.Popen | None = None
+
+    def _connect(self) -> subprocess.Popen | None:
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        self._proc = None
+        try:
+            proc = subprocess.Popen(
+                ["tmux", "-C", "attach-session", "-t", self.session,
+                 "-f", "no-output,ignore-size"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding="utf-8", errors="replace", bufsize=1,
+            )
+        except OSError:
+            return None
+        # The attach itself is acknowledged with a reply block; a missing
+        # session answers with %error instead
+        reply = _read_ctl_block(proc)
+        if reply is None or not reply[0]:
+            proc.kill()
+            proc.wait()
+            return None
+        self._proc = proc
+        return proc
+
+    def cmd(self, *cmds: str) -> tuple[bool, str] | None:
+        """Run tmux commands over the control connection.
+
+        Each command goes on its own line and is answered by its own reply
+        block; all are written before any reply is read. Returns (ok, output)
+        — ok only if every command succeeded, output from the last one — or
+        None if control mode is unavailable.
+        """
+        proc = self._connect()
+        if proc is None:
+            return None
+        try:
+            assert proc.stdin is not None
+            proc.stdin.write("".join(cmd + "\n" for cmd in cmds))
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._proc = None
+            return None
+        ok, lines = True, []
+        for _ in cmds:
+            reply = _read_ctl_block(proc)
+            if reply is None:
+                self._proc = None
+                return None
+            ok, lines = ok and reply[0], reply[1]
+        return ok, "\n".join(lines)
+
+    def capture(self) -> str:
+        """Return the visible contents of the session's pane."""
+        reply = self.cmd(f"capture-pane -t {self.session} -p")
+        if reply is not None:
+            return reply[1]
+        return subprocess.run(
+            ["tmux", "capture-pane", "-t", self.session, "-p"],
+            capture_output=True, text=True,
+        ).stdout
+
+    def alive(self) -> bool:
+        # The control client exits with its session, so a live pipe is proof
+        # enough; only ask tmux directly when control mode can't attach.
+        if self._connect() is not None:
+            return True
+        return subprocess.run(
+            ["tmux", "has-session", "-t", self.session],
+            capture_output=True,
+        ).returncode == 0
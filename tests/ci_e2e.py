@@ -18,13 +18,18 @@ Environment:
 
 from __future__ import annotations
 
+import concurrent.futures
+import http.client
 import json
 import os
 import ssl
 import sys
 import time
-import urllib.request
-import urllib.error
+
+try:
+    import orjson
+except ImportError:  # CI runs this with a bare interpreter
+    orjson = None
 
 # ---------------------------------------------------------------------------
 # Config
@@ -41,7 +46,97 @@ MODEL = os.environ.get("MODEL", "claude-haiku-4-5-20251001")
 # With checkpoint threshold at 25% of 200k = 50k tokens,
 # 3 rounds should hit it.
 PADDING_CHARS = 80_000
-PADDING = ("The quick brown fox jumps over the lazy dog. " * 2000)[:PADDING_CHARS]
+_PADDING_UNIT = "The quick brown fox jumps over the lazy dog. "
+PADDING = (_PADDING_UNIT * (PADDING_CHARS // len(_PADDING_UNIT) + 1))[:PADDING_CHARS]
+
+# TLS contexts are built once — loading the CA bundle is expensive and
+# every round would otherwise repeat it.
+_API_SSL_CTX = ssl.create_default_context()
+if os.path.exists(CA_CERT):
+    _API_SSL_CTX.load_verify_locations(CA_CERT)
+
+_DASHBOARD_SSL_CTX = ssl.create_default_context()
+_DASHBOARD_SSL_CTX.check_hostname = False
+_DASHBOARD_SSL_CTX.verify_mode = ssl.CERT_NONE
+
+# One CONNECT tunnel to the API and one dashboard connection, each reused
+# across rounds (HTTP keep-alive).
+_api_conn: http.client.HTTPSConnection | None = None
+_dash_conn: http.client.HTTPSConnection | None = None
+
+# Dashboard probes run here, off the request path; each round's probe is
+# collected at the start of the next. A single worker keeps _dash_conn
+# confined to one thread at a time.
+_DASHBOARD_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+
+def _get_api_conn() -> http.client.HTTPSConnection:
+    global _api_conn
+    if _api_conn is None:
+        _api_conn = http.client.HTTPSConnection(
+            "localhost", PROXY_PORT, timeout=60, context=_API_SSL_CTX,
+        )
+        _api_conn.set_tunnel("api.anthropic.com", 443)
+    return _api_conn
+
+
+def _drop_api_conn() -> None:
+    global _api_conn
+    if _api_conn is not None:
+        _api_conn.close()
+        _api_conn = None
+
+
+def _get_dash_conn() -> http.client.HTTPSConnection:
+    global _dash_conn
+    if _dash_conn is None:
+        _dash_conn = http.client.HTTPSConnection(
+            "localhost", DASHBOARD_PORT, timeout=10, context=_DASHBOARD_SSL_CTX,
+        )
+    return _dash_conn
+
+
+def _drop_dash_conn() -> None:
+    global _dash_conn
+    if _dash_conn is not None:
+        _dash_conn.close()
+        _dash_conn = None
+
+
+# Encoded form of each message already sent, paired with the message
+# object itself. The conversation only ever grows, so each round encodes
+# just the new turns instead of re-serializing the whole history.
+_encoded_messages: list[tuple[dict, bytes]] = []
+
+
+def _dumps(obj: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), check_circular=False).encode()
+
+
+def _loads(data: bytes) -> dict:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _encode_request(messages: list[dict], max_tokens: int) -> bytes:
+    # Reuse the cached prefix for as long as the message objects match
+    reused = 0
+    limit = min(len(_encoded_messages), len(messages))
+    while reused < limit and _encoded_messages[reused][0] is messages[reused]:
+        reused += 1
+    del _encoded_messages[reused:]
+    _encoded_messages.extend((msg, _dumps(msg)) for msg in messages[reused:])
+
+    head = _dumps({"model": MODEL, "max_tokens": max_tokens})[:-1]
+    return b"".join((
+        head,
+        b',"messages":[',
+        b",".join(encoded for _, encoded in _encoded_messages),
+        b"]}",
+    ))
 
 
 def log(msg: str) -> None:
@@ -49,52 +144,50 @@ def log(msg: str) -> None:
 
 
 def get_dashboard_state() -> dict | None:
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    url = f"https://localhost:{DASHBOARD_PORT}/health"
+    conn = _get_dash_conn()
     try:
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, context=ctx, timeout=10) as resp:
-            return json.loads(resp.read())
+        conn.request("GET", "/health")
+        resp = conn.getresponse()
+        data = resp.read()
+        if resp.will_close:
+            _drop_dash_conn()
+        if resp.status >= 400:
+            raise RuntimeError(f"HTTP {resp.status}")
+        return _loads(data)
     except Exception as exc:
+        _drop_dash_conn()
         log(f"Dashboard query failed: {exc}")
         return None
 
 
 def send_message(messages: list[dict], max_tokens: int = 128) -> dict:
     """Send a message through the CONNECT redirector to the API."""
-    ctx = ssl.create_default_context()
-    if os.path.exists(CA_CERT):
-        ctx.load_verify_locations(CA_CERT)
-
-    proxy_handler = urllib.request.ProxyHandler({
-        "https": f"http://localhost:{PROXY_PORT}",
-    })
-    opener = urllib.request.build_opener(
-        proxy_handler,
-        urllib.request.HTTPSHandler(context=ctx),
-    )
-
-    body = json.dumps({
-        "model": MODEL,
-        "max_tokens": max_tokens,
-        "messages": messages,
-    }).encode()
-
-    req = urllib.request.Request(
-        "https://api.anthropic.com/v1/messages",
-        data=body,
-        headers={
-            "x-api-key": API_KEY,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json",
-        },
-        method="POST",
-    )
-
-    with opener.open(req, timeout=60) as resp:
-        return json.loads(resp.read())
+    body = _encode_request(messages, max_tokens)
+
+    conn = _get_api_conn()
+    try:
+        conn.request(
+            "POST",
+            "/v1/messages",
+            body=body,
+            headers={
+                "x-api-key": API_KEY,
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json",
+            },
+        )
+        resp = conn.getresponse()
+        data = resp.read()
+    except Exception:
+        # Broken tunnel — reconnect on the next call.
+        _drop_api_conn()
+        raise
+
+    if resp.will_close:
+        _drop_api_conn()
+    if resp.status >= 400:
+        raise RuntimeError(f"HTTP {resp.status}: {data[:500]!r}")
+    return _loads(data)
 
 
 def extract_text(response: dict) -> str:
@@ -104,6 +197,15 @@ def extract_text(response: dict) -> str:
     return ""
 
 
+def _log_dashboard_state(state_future: concurrent.futures.Future | None) -> None:
+    """Wait for a pending dashboard probe, if any, and log its count."""
+    if state_future is None:
+        return
+    state = state_future.result()
+    if state:
+        log(f"  conversations: {state.get('conversations', 0)}")
+
+
 def main() -> int:
     if not API_KEY:
         log("ERROR: ANTHROPIC_API_KEY not set")
@@ -117,8 +219,12 @@ def main() -> int:
 
     messages: list[dict] = []
     start_time = time.time()
+    # Dashboard probe submitted after each response; its result is logged
+    # at the start of the next round, so it reflects the request just made.
+    state_future: concurrent.futures.Future | None = None
 
     for round_num in range(MAX_ROUNDS):
+        _log_dashboard_state(state_future)
         elapsed = time.time() - start_time
         if elapsed > TIMEOUT:
             log(f"TIMEOUT after {elapsed:.0f}s at round {round_num}")
@@ -159,9 +265,9 @@ def main() -> int:
         out_tok = usage.get("output_tokens", 0)
         log(f"  tokens: in={in_tok} out={out_tok} rtt={rtt:.1f}s msgs={len(messages)}")
 
-        state = get_dashboard_state()
-        if state:
-            log(f"  conversations: {state.get('conversations', 0)}")
+        state_future = _DASHBOARD_EXECUTOR.submit(get_dashboard_state)
+
+    _log_dashboard_state(state_future)
 
     # Final check
     messages.append({"role": "user", "content": "Say 'test complete'."})
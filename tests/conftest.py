@@ -0,0 +1,89 @@
+"""Shared pytest configuration."""
+
+import httpx
+import pytest
+import respx
+from aiohttp.test_utils import TestClient, TestServer
+
+from dbproxy.server import create_app
+
+
+# Test apps point their upstream httpx client at this base URL; exact-URL
+# routes avoid respx's per-request path regex matching.
+UPSTREAM_BASE = "https://api.anthropic.com"
+
+
+@pytest.fixture(scope="module")
+def _respx_router():
+    """One respx router per module; upstream routes are registered once."""
+    with respx.mock(assert_all_called=False) as router:
+        router.post(f"{UPSTREAM_BASE}/v1/messages", name="messages")
+        router.get(f"{UPSTREAM_BASE}/v1/models", name="models")
+        yield router
+
+
+def _clear_route(route: respx.Route) -> None:
+    route.reset()
+    route.mock(return_value=None, side_effect=None)
+
+
+@pytest.fixture
+def upstream(_respx_router):
+    """The mocked upstream /v1/messages route, cleared after each test."""
+    route = _respx_router["messages"]
+    yield route
+    _clear_route(route)
+
+
+@pytest.fixture
+def upstream_models(_respx_router):
+    """The mocked upstream /v1/models route, cleared after each test."""
+    route = _respx_router["models"]
+    yield route
+    _clear_route(route)
+
+
+@pytest.fixture(scope="module")
+def upstream_http():
+    """Upstream httpx client for a module's test app.
+
+    respx intercepts at the transport, so HTTP/2 negotiation, redirects
+    and a large pool are never exercised. The app closes the client on
+    cleanup, which is why this is module-scoped like the app rather than
+    session-scoped.
+    """
+    return httpx.AsyncClient(
+        base_url=UPSTREAM_BASE,
+        http2=False,
+        follow_redirects=False,
+        limits=httpx.Limits(max_connections=4),
+    )
+
+
+@pytest.fixture(scope="module")
+async def client(config, upstream_http):
+    """One app and test server shared by the whole module.
+
+    Each module using it defines its own ``config`` fixture.
+    """
+    app = await create_app(config, http_client=upstream_http)
+    async with TestClient(TestServer(app)) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+async def _reset_registry(client):
+    """Drop every conversation after each test so state doesn't leak.
+
+    Modules sharing ``client`` opt in with ``pytest.mark.usefixtures``.
+    """
+    yield
+    registry = client.app["registry"]
+    for mgr in registry.all_conversations().values():
+        await mgr.reset("test_teardown")
+    registry.clear()
+
+
+def _json_response(content: bytes) -> httpx.Response:
+    """A 200 upstream response carrying pre-encoded JSON bytes."""
+    return httpx.Response(200, content=content, headers={"content-type": "application/json"})
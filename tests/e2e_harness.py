@@ -29,14 +29,20 @@ Note on thresholds:
 
 from __future__ import annotations
 
-import json
+import atexit
+import itertools
 import os
+import re
 import ssl
 import subprocess
 import sys
-import tempfile
 import time
-import urllib.request
+from collections.abc import Callable
+
+import httpx
+import orjson
+
+from _tmux_ctl import TmuxControl, quote
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -53,6 +59,18 @@ SSL_CTX = ssl.create_default_context()
 SSL_CTX.check_hostname = False
 SSL_CTX.verify_mode = ssl.CERT_NONE
 
+# Keep-alive client for dashboard queries — one TLS handshake per run
+_HTTP = httpx.Client(base_url=BASE_URL, verify=SSL_CTX, timeout=10.0, http2=True)
+atexit.register(_HTTP.close)
+
+# Pane polling and input go over one tmux control-mode connection
+_TMUX = TmuxControl(TMUX_SESSION)
+
+# Pane markers: any of these means Claude Code is still working; the
+# permissions footer only renders once the prompt is ready again.
+_BUSY_RE = re.compile("✽|⏳|Thinking|Churned|queued")
+_IDLE_RE = re.compile("bypass permissions")
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -68,102 +86,177 @@ def fail(msg: str) -> None:
 
 
 def api_get(path: str) -> dict:
-    url = f"{BASE_URL}{path}"
     try:
-        with urllib.request.urlopen(url, context=SSL_CTX, timeout=10) as resp:
-            return json.loads(resp.read())
+        resp = _HTTP.get(path)
+        resp.raise_for_status()
+        return resp.json()
     except Exception as exc:
         fail(f"GET {path} failed: {exc}")
         return {}
 
 
 def tmux_send(text: str) -> None:
-    """Send text to tmux and submit with C-m."""
-    if len(text) < 800:
-        subprocess.run(
-            ["tmux", "send-keys", "-t", TMUX_SESSION, "-l", text],
-            check=True,
-        )
-    else:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-            f.write(text)
-            tmp = f.name
-        try:
-            subprocess.run(["tmux", "load-buffer", tmp], check=True)
-            subprocess.run(["tmux", "paste-buffer", "-t", TMUX_SESSION], check=True)
-        finally:
-            os.unlink(tmp)
+    """Paste text into tmux (bracketed paste) and submit with C-m."""
+    reply = _TMUX.cmd(
+        f"set-buffer -b e2e -- {quote(text)}",
+        f"paste-buffer -p -d -b e2e -t {TMUX_SESSION}",
+        f"send-keys -t {TMUX_SESSION} C-m",
+    )
+    if reply is not None:
+        if not reply[0]:
+            raise RuntimeError(f"tmux_send failed: {reply[1]}")
+        return
+
+    subprocess.run(["tmux", "load-buffer", "-b", "e2e", "-"], input=text.encode(), check=True)
+    subprocess.run(
+        ["tmux", "paste-buffer", "-p", "-d", "-b", "e2e", "-t", TMUX_SESSION],
+        check=True,
+    )
     subprocess.run(["tmux", "send-keys", "-t", TMUX_SESSION, "C-m"], check=True)
 
 
-def tmux_alive() -> bool:
-    return subprocess.run(
-        ["tmux", "has-session", "-t", TMUX_SESSION],
-        capture_output=True,
-    ).returncode == 0
+LOG_FILE = "/tmp/proxy.log"
+
+# Incremental parse state for log_events(): byte offset of the first
+# unparsed line, every event parsed so far, and the set of event names
+# among them.
+_LOG_CACHE: dict = {"pos": 0, "events": [], "names": set()}
 
 
 def log_events() -> list[dict]:
-    """Parse JSON lines from the proxy log."""
-    out = []
+    """Parse JSON lines from the proxy log.
+
+    Only bytes appended since the previous call are read; a file that
+    shrank (truncated or rotated) is re-read from the start. The returned
+    list is shared — callers must not mutate it.
+    """
     try:
-        with open("/tmp/proxy.log") as f:
-            for line in f:
-                try:
-                    out.append(json.loads(line.strip()))
-                except (json.JSONDecodeError, ValueError):
-                    pass
+        with open(LOG_FILE, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _LOG_CACHE["pos"]:
+                _LOG_CACHE["pos"] = 0
+                _LOG_CACHE["events"] = []
+                _LOG_CACHE["names"] = set()
+            if hasattr(os, "posix_fadvise"):  # not on macOS
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            f.seek(_LOG_CACHE["pos"])
+            chunk = f.read()
     except FileNotFoundError:
-        pass
-    return out
+        return _LOG_CACHE["events"]
+
+    # Leave a trailing partial line for the next call
+    end = chunk.rfind(b"\n") + 1
+    _LOG_CACHE["pos"] += end
+    events = _LOG_CACHE["events"]
+    names = _LOG_CACHE["names"]
+    for line in chunk[:end].splitlines():
+        try:
+            event = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        events.append(event)
+        if isinstance(event, dict):
+            names.add(event.get("event"))
+    return events
 
 
-def seen_events(names: set[str]) -> list[dict]:
-    return [e for e in log_events() if e.get("event") in names]
+def seen_events(names: set[str]) -> bool:
+    """True if any event with one of these names has been logged."""
+    log_events()
+    return not _LOG_CACHE["names"].isdisjoint(names)
+
+
+def _is_main_tokens_update(e: dict) -> bool:
+    # Haiku side requests log tokens_updated too, but with tiny totals
+    return e.get("event") == "tokens_updated" and e.get("total", 0) > 500
+
+
+def wait_for_event(match: Callable[[dict], bool], timeout: float, since: int = 0) -> bool:
+    """Wait until an event satisfying ``match`` is logged at index >= ``since``."""
+    deadline = time.time() + timeout
+    while True:
+        events = log_events()
+        if any(isinstance(e, dict) and match(e) for e in events[since:]):
+            return True
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.1)
+
+
+# (events list id, event count, phase, tokens) from the last _scan_latest
+_LATEST_CACHE: tuple[int, int, str | None, int] = (0, -1, None, 0)
+
+
+def _scan_latest(events: list[dict]) -> tuple[str | None, int]:
+    """Find the latest main-model phase and token total in one reverse pass.
+
+    Cached on the event count, so repeat calls within one tick are free.
+    """
+    global _LATEST_CACHE
+    if _LATEST_CACHE[:2] == (id(events), len(events)):
+        return _LATEST_CACHE[2], _LATEST_CACHE[3]
+
+    phase: str | None = None
+    tokens = 0
+    phase_found = tokens_found = False
+    for e in reversed(events):
+        event = e.get("event")
+        if (
+            not phase_found
+            and event == "request_received"
+            and e.get("model") != "claude-haiku-4-5-20251001"
+        ):
+            phase = e.get("phase")
+            phase_found = True
+        elif not tokens_found and _is_main_tokens_update(e):
+            tokens = e.get("total", 0)
+            tokens_found = True
+        if phase_found and tokens_found:
+            break
+
+    _LATEST_CACHE = (id(events), len(events), phase, tokens)
+    return phase, tokens
 
 
 def latest_phase() -> str | None:
-    for e in reversed(log_events()):
-        if e.get("event") == "request_received" and e.get("model") != "claude-haiku-4-5-20251001":
-            return e.get("phase")
-    return None
+    return _scan_latest(log_events())[0]
 
 
 def latest_tokens() -> int:
     """Get the most recent input token count from proxy logs."""
-    for e in reversed(log_events()):
-        if e.get("event") == "tokens_updated" and e.get("total", 0) > 500:
-            return e.get("total", 0)
-    return 0
+    return _scan_latest(log_events())[1]
 
 
-def wait_idle(timeout: float = 120) -> bool:
-    """Wait until Claude Code is idle (no spinner, no queue)."""
+def wait_idle(timeout: float = 120, assume_started: bool = False) -> bool:
+    """Wait until Claude Code is idle (no spinner, no queue).
+
+    With ``assume_started`` the caller has just submitted input, so the
+    separate start-detection phase is skipped. The pane is still not
+    trusted to be idle until it has shown busy once (or a short grace
+    period has passed), since the spinner can take a moment to appear.
+    """
     start = time.time()
-    # Wait for processing to start
-    started = False
-    while time.time() - start < min(15, timeout):
-        r = subprocess.run(
-            ["tmux", "capture-pane", "-t", TMUX_SESSION, "-p"],
-            capture_output=True, text=True,
-        )
-        if any(s in r.stdout for s in ("✽", "⏳", "Thinking", "Churned", "queued")):
-            started = True
-            break
-        time.sleep(1)
-    if not started:
-        time.sleep(3)
+    seen_busy = False
+    if not assume_started:
+        # Wait for processing to start
+        while time.time() - start < min(15, timeout):
+            if _BUSY_RE.search(_TMUX.capture()):
+                seen_busy = True
+                break
+            time.sleep(1)
+        if not seen_busy:
+            time.sleep(3)
+            seen_busy = True
 
     # Wait for processing to finish
     while time.time() - start < timeout:
-        r = subprocess.run(
-            ["tmux", "capture-pane", "-t", TMUX_SESSION, "-p"],
-            capture_output=True, text=True,
-        )
-        busy = any(s in r.stdout for s in ("✽", "⏳", "Thinking", "Churned", "queued"))
-        if not busy and "bypass permissions" in r.stdout:
+        pane = _TMUX.capture()
+        elapsed = time.time() - start
+        if _BUSY_RE.search(pane):
+            seen_busy = True
+        elif (seen_busy or elapsed > 3) and _IDLE_RE.search(pane):
             return True
-        time.sleep(2)
+        # Short replies finish within seconds; long ones can be polled lazily
+        time.sleep(0.1 if elapsed < 5 else 0.5 if elapsed < 30 else 2.0)
     return False
 
 
@@ -182,14 +275,14 @@ def run() -> None:
         fail(f"Proxy unhealthy: {health}")
     log(f"Proxy OK (convs={health.get('conversations', 0)})")
 
-    if not tmux_alive():
+    if not _TMUX.alive():
         fail(f"tmux session '{TMUX_SESSION}' not found")
     log("tmux session OK")
 
     # Seed conversation
     log("Sending seed message...")
     tmux_send("What is 2+2? Reply with just the number.")
-    wait_idle(timeout=30)
+    wait_idle(timeout=30, assume_started=True)
     log(f"  phase={latest_phase()} tokens={latest_tokens()}")
 
     CHECKPOINT_EVENTS = {
@@ -203,7 +296,7 @@ def run() -> None:
 
     # Verbose prompts that produce long responses to inflate context faster.
     # Each response adds ~2000-5000 tokens to conversation history.
-    prompts = [
+    prompts = (
         "Write a detailed 1500-word technical analysis of microservice architecture patterns including service mesh, event sourcing, CQRS, and saga patterns. Cover tradeoffs, failure modes, and when to use each pattern. Be extremely thorough.",
         "Write a comprehensive 1500-word comparison of database indexing strategies: B-tree, hash, GIN, GiST, and BRIN indexes. Include concrete examples of queries each optimizes for, storage overhead, and maintenance costs. Be very detailed.",
         "Write a detailed 1500-word explanation of distributed consensus algorithms: Raft, Paxos, and PBFT. Cover leader election, log replication, membership changes, and Byzantine fault tolerance. Include specific message flow examples.",
@@ -212,7 +305,8 @@ def run() -> None:
         "Write a detailed 1500-word analysis of container orchestration internals: how Kubernetes scheduling works, pod lifecycle, CNI networking, CSI storage, and the control plane reconciliation loop. Be thorough.",
         "Write a 1500-word deep dive into Linux kernel networking: the packet receive path from NIC interrupt through NAPI, sk_buff, netfilter hooks, and socket delivery. Cover XDP and eBPF optimizations.",
         "Write a comprehensive 1500-word explanation of modern CPU cache architecture: L1/L2/L3 cache hierarchies, cache coherence protocols (MESI, MOESI), false sharing, prefetching strategies, and their impact on software performance.",
-    ]
+    )
+    prompt_cycle = itertools.cycle(prompts)
 
     for i in range(MAX_ROUNDS):
         tokens = latest_tokens()
@@ -228,8 +322,8 @@ def run() -> None:
         if swap_ok:
             break
 
-        tmux_send(prompts[i % len(prompts)])
-        wait_idle(timeout=120)
+        tmux_send(next(prompt_cycle))
+        wait_idle(timeout=120, assume_started=True)
 
     # Final check
     if not checkpoint_ok and seen_events(CHECKPOINT_EVENTS):
@@ -240,8 +334,14 @@ def run() -> None:
     # Post-swap verification
     if swap_ok:
         log("Verifying Claude works after swap...")
+        since = len(log_events())
         tmux_send("What is 7+7? Reply with just the number.")
-        if wait_idle(timeout=30):
+        # Usage is logged once the main model's reply comes back through the
+        # proxy; the pane going idle after that shows Claude Code took it
+        if (
+            wait_for_event(_is_main_tokens_update, timeout=30, since=since)
+            and wait_idle(timeout=30, assume_started=True)
+        ):
             log("Claude responded after swap OK")
         else:
             log("WARNING: Claude did not respond after swap")
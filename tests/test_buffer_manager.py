@@ -1,28 +1,32 @@
 """Tests for buffer manager."""
 
 import asyncio
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from dbproxy.buffer.manager import BufferManager
 from dbproxy.buffer.state_machine import BufferPhase
+from dbproxy.buffer.swap import serialize_swap_response_bytes
+
+
+@pytest.fixture
+def mgr():
+    return BufferManager("test", "claude-sonnet-4-6", 200_000)
 
 
 class TestBufferManager:
-    def test_initial_state(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    def test_initial_state(self, mgr):
         assert mgr.phase == BufferPhase.IDLE
         assert mgr.total_input_tokens == 0
         assert mgr.utilization == 0.0
         assert mgr.checkpoint_content is None
 
-    def test_utilization_calculation(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    def test_utilization_calculation(self, mgr):
         mgr.total_input_tokens = 140_000
         assert mgr.utilization == 0.7
 
-    def test_update_tokens(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    def test_update_tokens(self, mgr):
         mgr.update_tokens({
             "input_tokens": 100_000,
             "cache_creation_input_tokens": 20_000,
@@ -41,8 +45,7 @@ class TestBufferManager:
         assert d["total_input_tokens"] == 50_000
 
     @pytest.mark.asyncio
-    async def test_reset(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    async def test_reset(self, mgr):
         mgr.phase = BufferPhase.WAL_ACTIVE
         mgr.checkpoint_content = "summary"
         await mgr.reset("test")
@@ -50,8 +53,7 @@ class TestBufferManager:
         assert mgr.checkpoint_content is None
 
     @pytest.mark.asyncio
-    async def test_execute_swap(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    async def test_execute_swap(self, mgr):
         mgr.phase = BufferPhase.SWAP_READY
         mgr.checkpoint_content = "This is a summary of the conversation."
         result = await mgr.execute_swap(stream=False)
@@ -61,8 +63,7 @@ class TestBufferManager:
         assert mgr.phase == BufferPhase.IDLE
 
     @pytest.mark.asyncio
-    async def test_execute_swap_streaming(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    async def test_execute_swap_streaming(self, mgr):
         mgr.phase = BufferPhase.SWAP_READY
         mgr.checkpoint_content = "Summary"
         result = await mgr.execute_swap(stream=True)
@@ -71,8 +72,7 @@ class TestBufferManager:
         assert mgr.phase == BufferPhase.IDLE
 
     @pytest.mark.asyncio
-    async def test_execute_swap_wrong_phase(self):
-        mgr = BufferManager("test", "claude-sonnet-4-6", 200_000)
+    async def test_execute_swap_wrong_phase(self, mgr):
         with pytest.raises(RuntimeError, match="Cannot swap"):
             await mgr.execute_swap(stream=False)
 
@@ -80,11 +80,7 @@ class TestBufferManager:
 class TestThresholdSkip:
     """Test when utilization jumps past both checkpoint AND swap thresholds."""
 
-    @pytest.mark.asyncio
-    async def test_idle_to_swap_ready_in_one_jump(self):
-        """Utilization jumps from below checkpoint to above swap in one request."""
-        from unittest.mock import AsyncMock, patch
-
+    async def _evaluate_at(self, tokens):
         mgr = BufferManager("test", "claude-sonnet-4-6", 200_000,
                             checkpoint_threshold=0.60, swap_threshold=0.80)
         mgr._auth_headers = {"authorization": "Bearer test"}
@@ -93,8 +89,7 @@ class TestThresholdSkip:
             {"role": "user", "content": "hello"},
             {"role": "assistant", "content": "hi"},
         ]
-        # Set tokens to 83% — above both checkpoint (60%) and swap (80%)
-        mgr.total_input_tokens = 166_000
+        mgr.total_input_tokens = tokens
 
         # Mock run_checkpoint to return immediately
         with patch(
@@ -104,36 +99,53 @@ class TestThresholdSkip:
         ):
             http_client = AsyncMock()
             await mgr.evaluate_thresholds(http_client, "https://api.anthropic.com")
+        return mgr
 
+    @pytest.mark.asyncio
+    async def test_idle_to_swap_ready_in_one_jump(self):
+        """Utilization jumps from below checkpoint to above swap in one request."""
+        # 83% — above both checkpoint (60%) and swap (80%)
+        mgr = await self._evaluate_at(166_000)
         assert mgr.phase == BufferPhase.SWAP_READY
         assert mgr.checkpoint_content == "Checkpoint summary"
 
     @pytest.mark.asyncio
     async def test_idle_to_checkpoint_when_below_swap(self):
         """Normal case: crosses checkpoint but not swap threshold."""
-        from unittest.mock import AsyncMock, patch
+        # 65% — above checkpoint (60%) but below swap (80%)
+        mgr = await self._evaluate_at(130_000)
+        assert mgr.phase != BufferPhase.SWAP_READY
 
+
+class TestCheckpointDone:
+    @pytest.mark.asyncio
+    async def test_event_tracks_background_checkpoint(self):
         mgr = BufferManager("test", "claude-sonnet-4-6", 200_000,
                             checkpoint_threshold=0.60, swap_threshold=0.80)
         mgr._auth_headers = {"authorization": "Bearer test"}
-        mgr._system = "test system"
         mgr._all_messages = [
             {"role": "user", "content": "hello"},
             {"role": "assistant", "content": "hi"},
         ]
-        # Set tokens to 65% — above checkpoint (60%) but below swap (80%)
         mgr.total_input_tokens = 130_000
+        assert mgr.checkpoint_done.is_set()
 
-        with patch(
-            "dbproxy.buffer.manager.run_checkpoint",
-            new_callable=AsyncMock,
-            return_value="Checkpoint summary",
-        ):
-            http_client = AsyncMock()
-            await mgr.evaluate_thresholds(http_client, "https://api.anthropic.com")
+        release = asyncio.Event()
 
-        # Should NOT be in SWAP_READY — only crossed checkpoint threshold
-        assert mgr.phase != BufferPhase.SWAP_READY
+        async def slow_checkpoint(**_):
+            await release.wait()
+            return "Checkpoint summary"
+
+        with patch("dbproxy.buffer.manager.run_checkpoint", side_effect=slow_checkpoint):
+            await mgr.evaluate_thresholds(AsyncMock(), "https://api.anthropic.com")
+            assert mgr.phase == BufferPhase.CHECKPOINTING
+            assert not mgr.checkpoint_done.is_set()
+
+            release.set()
+            await asyncio.wait_for(mgr.checkpoint_done.wait(), timeout=2.0)
+
+        assert mgr.phase == BufferPhase.WAL_ACTIVE
+        assert mgr.checkpoint_content == "Checkpoint summary"
 
 
 class TestSwapWalStitching:
@@ -146,127 +158,113 @@ class TestSwapWalStitching:
         return mgr
 
     @pytest.mark.asyncio
-    async def test_swap_includes_wal_messages(self):
-        """Normal case: messages after checkpoint anchor are stitched in."""
-        mgr = self._make_mgr()
-        mgr._all_messages = [
-            {"role": "user", "content": "old msg 1"},
-            {"role": "assistant", "content": "old reply 1"},
-            {"role": "user", "content": "new msg after checkpoint"},
-            {"role": "assistant", "content": "new reply after checkpoint"},
-        ]
-        mgr.checkpoint_anchor_index = 2  # checkpoint covered [0:2]
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "Summary of early conversation." in content
-        assert "<context_summary>" in content
-        assert "<recent_activity>" in content
-        assert "new msg after checkpoint" in content
-        assert "new reply after checkpoint" in content
-        # Old messages should NOT be in the WAL section
-        assert "old msg 1" not in content
-
-    @pytest.mark.asyncio
-    async def test_swap_empty_wal_when_no_messages_after_anchor(self):
-        """Checkpoint covered everything — no WAL to stitch."""
-        mgr = self._make_mgr()
-        mgr._all_messages = [
-            {"role": "user", "content": "msg 1"},
-            {"role": "assistant", "content": "reply 1"},
-        ]
-        mgr.checkpoint_anchor_index = 2  # checkpoint covered all messages
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "Summary of early conversation." in content
-        assert "<context_summary>" in content
-        assert "<recent_activity>" not in content
-
-    @pytest.mark.asyncio
-    async def test_swap_no_anchor_index(self):
-        """checkpoint_anchor_index is None — treat as empty WAL."""
+    @pytest.mark.parametrize(
+        "messages,anchor,must_contain,must_not_contain",
+        [
+            pytest.param(
+                [
+                    {"role": "user", "content": "old msg 1"},
+                    {"role": "assistant", "content": "old reply 1"},
+                    {"role": "user", "content": "new msg after checkpoint"},
+                    {"role": "assistant", "content": "new reply after checkpoint"},
+                ],
+                2,  # checkpoint covered [0:2]
+                [
+                    "Summary of early conversation.",
+                    "<context_summary>",
+                    "<recent_activity>",
+                    "new msg after checkpoint",
+                    "new reply after checkpoint",
+                ],
+                # Old messages should NOT be in the WAL section
+                ["old msg 1"],
+                id="includes_wal_messages",
+            ),
+            pytest.param(
+                [
+                    {"role": "user", "content": "msg 1"},
+                    {"role": "assistant", "content": "reply 1"},
+                ],
+                2,  # checkpoint covered all messages — no WAL to stitch
+                ["Summary of early conversation.", "<context_summary>"],
+                ["<recent_activity>"],
+                id="empty_wal_when_no_messages_after_anchor",
+            ),
+            pytest.param(
+                [{"role": "user", "content": "msg"}],
+                None,  # treat as empty WAL
+                ["Summary of early conversation.", "<context_summary>"],
+                ["<recent_activity>"],
+                id="no_anchor_index",
+            ),
+            pytest.param(
+                [],  # shouldn't happen, but defensive
+                5,
+                ["Summary of early conversation."],
+                [],
+                id="empty_all_messages",
+            ),
+            pytest.param(
+                [{"role": "user", "content": "only msg"}],
+                10,  # anchor exceeds message count — empty WAL slice
+                [],
+                ["<recent_activity>"],
+                id="anchor_beyond_messages",
+            ),
+            pytest.param(
+                # The most common real case: WAL holds a tool_use cycle
+                [
+                    {"role": "user", "content": "old"},
+                    # WAL starts here
+                    {"role": "assistant", "content": [
+                        {"type": "text", "text": "Let me read that file."},
+                        {"type": "tool_use", "id": "t1", "name": "Read",
+                         "input": {"file_path": "/home/user/project/main.py"}},
+                    ]},
+                    {"role": "user", "content": [
+                        {"type": "tool_result", "tool_use_id": "t1",
+                         "content": [{"type": "text", "text": "def main():\n    pass"}]},
+                    ]},
+                    {"role": "assistant", "content": [
+                        {"type": "text", "text": "The file contains a main function."},
+                    ]},
+                ],
+                1,
+                [
+                    "[tool_use: Read(",
+                    "[tool_result] def main():",
+                    "Let me read that file.",
+                    "The file contains a main function.",
+                ],
+                [],
+                id="wal_with_tool_use_cycle",
+            ),
+            pytest.param(
+                # WAL contains a compaction block from a previous /compact
+                [
+                    {"role": "assistant", "content": [
+                        {"type": "compaction", "content": "Prior session summary..."},
+                    ]},
+                    {"role": "user", "content": "continue working"},
+                ],
+                0,
+                ["[prior compaction summary]", "continue working"],
+                [],
+                id="wal_with_prior_compaction",
+            ),
+        ],
+    )
+    async def test_swap_wal_stitching(self, messages, anchor, must_contain, must_not_contain):
         mgr = self._make_mgr()
-        mgr._all_messages = [
-            {"role": "user", "content": "msg"},
-        ]
-        mgr.checkpoint_anchor_index = None
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "Summary of early conversation." in content
-        assert "<context_summary>" in content
-        assert "<recent_activity>" not in content
-
-    @pytest.mark.asyncio
-    async def test_swap_empty_all_messages(self):
-        """_all_messages is empty (shouldn't happen, but defensive)."""
-        mgr = self._make_mgr()
-        mgr._all_messages = []
-        mgr.checkpoint_anchor_index = 5
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "Summary of early conversation." in content
-
-    @pytest.mark.asyncio
-    async def test_swap_anchor_beyond_messages(self):
-        """Anchor index exceeds message count — empty WAL slice."""
-        mgr = self._make_mgr()
-        mgr._all_messages = [
-            {"role": "user", "content": "only msg"},
-        ]
-        mgr.checkpoint_anchor_index = 10
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "<recent_activity>" not in content
-
-    @pytest.mark.asyncio
-    async def test_swap_wal_with_tool_use_cycle(self):
-        """WAL contains tool_use and tool_result — the most common real case."""
-        mgr = self._make_mgr()
-        mgr.checkpoint_anchor_index = 1
-        mgr._all_messages = [
-            {"role": "user", "content": "old"},
-            # WAL starts here
-            {"role": "assistant", "content": [
-                {"type": "text", "text": "Let me read that file."},
-                {"type": "tool_use", "id": "t1", "name": "Read",
-                 "input": {"file_path": "/home/user/project/main.py"}},
-            ]},
-            {"role": "user", "content": [
-                {"type": "tool_result", "tool_use_id": "t1",
-                 "content": [{"type": "text", "text": "def main():\n    pass"}]},
-            ]},
-            {"role": "assistant", "content": [
-                {"type": "text", "text": "The file contains a main function."},
-            ]},
-        ]
-
-        result = await mgr.execute_swap(stream=False)
-        content = result["content"][0]["text"]
-        assert "[tool_use: Read(" in content
-        assert "[tool_result] def main():" in content
-        assert "Let me read that file." in content
-        assert "The file contains a main function." in content
-
-    @pytest.mark.asyncio
-    async def test_swap_wal_with_prior_compaction(self):
-        """WAL contains a compaction block from a previous /compact."""
-        mgr = self._make_mgr()
-        mgr.checkpoint_anchor_index = 0
-        mgr._all_messages = [
-            {"role": "assistant", "content": [
-                {"type": "compaction", "content": "Prior session summary..."},
-            ]},
-            {"role": "user", "content": "continue working"},
-        ]
+        mgr._all_messages = messages
+        mgr.checkpoint_anchor_index = anchor
 
         result = await mgr.execute_swap(stream=False)
         content = result["content"][0]["text"]
-        assert "[prior compaction summary]" in content
-        assert "continue working" in content
+        for expected in must_contain:
+            assert expected in content
+        for unexpected in must_not_contain:
+            assert unexpected not in content
 
     @pytest.mark.asyncio
     async def test_swap_wal_truncates_large_tool_results(self):
@@ -298,7 +296,6 @@ class TestSwapWalStitching:
         result = await mgr.execute_swap(stream=True)
         assert isinstance(result, list)
         # Serialize and check WAL is present in SSE bytes
-        from dbproxy.buffer.swap import serialize_swap_response_bytes
         raw = serialize_swap_response_bytes(result, stream=True)
         assert b"recent_activity" in raw
         assert b"new after checkpoint" in raw
@@ -13,8 +13,9 @@ from dbproxy.connect_redirector import handle_connect, REDIRECT_HOST
 async def echo_server():
     """Start a TCP echo server that sends back whatever it receives."""
     async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        data = await reader.read(4096)
-        writer.write(data)
+        # Pump until EOF; only wait on drain once everything is queued
+        while chunk := await reader.read(4096):
+            writer.write(chunk)
         await writer.drain()
         writer.close()
 
@@ -41,13 +42,10 @@ async def _connect_through(proxy_port: int, target: str) -> tuple[asyncio.Stream
     reader, writer = await asyncio.open_connection("127.0.0.1", proxy_port)
     writer.write(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode())
     await writer.drain()
-    response = await asyncio.wait_for(reader.readline(), timeout=5)
-    assert b"200" in response, f"Expected 200, got: {response}"
-    # Consume remaining header lines
-    while True:
-        line = await asyncio.wait_for(reader.readline(), timeout=5)
-        if line in (b"\r\n", b"\n", b""):
-            break
+    # Status line and headers arrive together — consume them in one read
+    response = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+    status, _ = response.split(b"\r\n", 1)
+    assert b"200" in status, f"Expected 200, got: {status}"
     return reader, writer
 
 
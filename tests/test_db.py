@@ -1,20 +1,38 @@
 """Tests for database operations."""
 
+import asyncio
+import json
 import os
-import tempfile
+import shutil
 
 import pytest
 
-from dbproxy.store.db import Database
+from dbproxy.store.db import Database, NullDatabase
+
+
+@pytest.fixture(scope="session")
+async def _schema_template(tmp_path_factory):
+    """A database with the schema already applied, built once per session.
+
+    Under pytest-xdist each worker builds its own copy; tests only ever
+    copy it, never open it directly.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "master")
+    path = tmp_path_factory.mktemp("db") / f"schema_{worker}.sqlite"
+    template = Database(str(path))
+    await template.connect()
+    await template.close()
+    return path
 
 
 @pytest.fixture
-async def db():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        db = Database(os.path.join(tmpdir, "test.sqlite"))
-        await db.connect()
-        yield db
-        await db.close()
+async def db(_schema_template, tmp_path):
+    path = tmp_path / "test.sqlite"
+    shutil.copyfile(_schema_template, path)
+    db = Database(str(path))
+    await db.connect()
+    yield db
+    await db.close()
 
 
 class TestDatabase:
@@ -28,6 +46,57 @@ class TestDatabase:
         assert "messages" in tables
         assert "events" in tables
 
+    @pytest.mark.asyncio
+    async def test_connect_creates_schema_in_fresh_db(self, tmp_path):
+        db = Database(str(tmp_path / "fresh.sqlite"))
+        await db.connect()
+        try:
+            cursor = await db.conn.execute("PRAGMA user_version")
+            assert (await cursor.fetchone())[0] >= 1
+            cursor = await db.conn.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type='table' AND name='events'"
+            )
+            assert (await cursor.fetchone())[0] == 1
+        finally:
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_shared_cache_across_connections(self):
+        uri = "file:dbproxy_test_shared?mode=memory&cache=shared"
+        first, second = Database(uri), Database(uri)
+        await first.connect()
+        await second.connect()
+        try:
+            await first.upsert_conversation("fp_shared", "claude-sonnet-4-6", 200_000, "IDLE")
+            conv = await second.get_conversation("fp_shared")
+            assert conv is not None
+        finally:
+            await second.close()
+            await first.close()
+
+    @pytest.mark.asyncio
+    async def test_memory_databases_are_isolated(self):
+        first, second = Database(":memory:"), Database(":memory:")
+        await first.connect()
+        await second.connect()
+        try:
+            await first.upsert_conversation("fp_mem", "claude-sonnet-4-6", 200_000, "IDLE")
+            assert await second.get_conversation("fp_mem") is None
+        finally:
+            await second.close()
+            await first.close()
+
+    @pytest.mark.asyncio
+    async def test_connect_applies_pragmas(self, db):
+        cursor = await db.conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+        cursor = await db.conn.execute("PRAGMA synchronous")
+        assert (await cursor.fetchone())[0] == 1  # NORMAL
+        cursor = await db.conn.execute("PRAGMA busy_timeout")
+        assert (await cursor.fetchone())[0] == 5000
+        cursor = await db.conn.execute("PRAGMA cache_spill")
+        assert (await cursor.fetchone())[0] == 0
+
     @pytest.mark.asyncio
     async def test_upsert_and_get_conversation(self, db):
         await db.upsert_conversation(
@@ -60,6 +129,20 @@ class TestDatabase:
         rows = await db.list_conversations()
         assert len(rows) == 2
 
+        columns = await db.list_conversations_columnar()
+        assert columns["fingerprint"] == [r.fingerprint for r in rows]
+        assert columns["phase"] == [r.phase for r in rows]
+
+        subset = await db.list_conversations_columnar(("fingerprint", "phase"))
+        assert set(subset) == {"fingerprint", "phase"}
+        assert sorted(subset["phase"]) == ["IDLE", "WAL_ACTIVE"]
+
+    @pytest.mark.asyncio
+    async def test_list_conversations_columnar_empty_and_invalid(self, db):
+        assert await db.list_conversations_columnar(("fingerprint",)) == {"fingerprint": []}
+        with pytest.raises(ValueError, match="Unknown conversation columns"):
+            await db.list_conversations_columnar(("fingerprint; DROP TABLE events",))
+
     @pytest.mark.asyncio
     async def test_delete_conversation(self, db):
         await db.upsert_conversation("abc", "claude-sonnet-4-6", 200_000, "IDLE")
@@ -74,8 +157,83 @@ class TestDatabase:
         events = await db.get_recent_events("conv1")
         assert len(events) == 2
         assert events[0].event_type == "checkpoint_started"  # Most recent first
+        assert events[0].payload_json is None
+        assert json.loads(events[1].payload_json) == {"from": "IDLE", "to": "WAL_ACTIVE"}
+
+    @pytest.mark.asyncio
+    async def test_log_events_batch_preserves_order(self, db):
+        await db.log_event("first", "conv1")
+        await db.log_events_batch([
+            ("second", "conv1", {"n": 2}),
+            ("third", "conv1", None),
+        ])
+        cursor = await db.conn.execute(
+            "SELECT event_type, payload_json FROM events WHERE fingerprint = ? ORDER BY id",
+            ("conv1",),
+        )
+        rows = await cursor.fetchall()
+        assert [r[0] for r in rows] == ["first", "second", "third"]
+        assert json.loads(rows[1][1]) == {"n": 2}
+
+    @pytest.mark.asyncio
+    async def test_queued_events_written_on_close(self, tmp_path):
+        path = str(tmp_path / "events.sqlite")
+        db = Database(path)
+        await db.connect()
+        await db.log_event("queued", "conv1")
+        await db.close()
+
+        await db.connect()
+        try:
+            events = await db.get_recent_events("conv1")
+            assert [e.event_type for e in events] == ["queued"]
+        finally:
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_reads_and_close_wait_for_in_flight_flush(self, tmp_path):
+        db = Database(str(tmp_path / "inflight.sqlite"))
+        await db.connect()
+        commit = db.conn.commit
+        committing = asyncio.Event()
+
+        async def slow_commit():
+            committing.set()
+            await asyncio.sleep(0.05)
+            await commit()
+
+        db.conn.commit = slow_commit  # type: ignore[method-assign]
+        await db.log_event("first", "conv1")
+        await committing.wait()  # background flush has taken the buffer
+        assert [e.event_type for e in await db.get_recent_events("conv1")] == ["first"]
+
+        committing.clear()
+        await db.log_event("second", "conv1")
+        await committing.wait()
+        await db.close()
+
+        await db.connect()
+        try:
+            events = await db.get_recent_events("conv1")
+            assert {e.event_type for e in events} == {"first", "second"}
+        finally:
+            await db.close()
 
     @pytest.mark.asyncio
     async def test_get_nonexistent_conversation(self, db):
         row = await db.get_conversation("nonexistent")
         assert row is None
+
+
+class TestNullDatabase:
+    @pytest.mark.asyncio
+    async def test_writes_discarded_reads_empty(self):
+        db = NullDatabase()
+        await db.connect()
+        await db.upsert_conversation("abc", "claude-sonnet-4-6", 200_000, "IDLE")
+        await db.log_event("phase_transition", "abc", {"to": "WAL_ACTIVE"})
+        assert await db.get_conversation("abc") is None
+        assert await db.list_conversations() == []
+        assert await db.list_conversations_columnar(("fingerprint",)) == {"fingerprint": []}
+        assert await db.get_recent_events("abc") == []
+        await db.close()
@@ -1,6 +1,6 @@
 """End-to-end lifecycle test: IDLE → checkpoint → WAL → swap → IDLE.
 
-Runs the proxy in-process with aiohttp_client + respx mocking.
+Runs the proxy in-process on a shared aiohttp test server + respx mocking.
 No real API calls. Verifies the full double-buffer lifecycle including
 phase transitions, swap responses, WAL stitching, and state reset.
 """
@@ -8,24 +8,28 @@ phase transitions, swap responses, WAL stitching, and state reset.
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
 
-import pytest
 import httpx
-import respx
+import orjson
+import pytest
 from httpx import Response
 
 from dbproxy.buffer.state_machine import BufferPhase
 from dbproxy.config import ProxyConfig
 from dbproxy.identity.fingerprint import compute_fingerprint
-from dbproxy.server import create_app
+
+from .conftest import _json_response
+
+# Keep the module-scoped app/server on a single xdist worker (--dist loadgroup)
+pytestmark = [pytest.mark.xdist_group("lifecycle"), pytest.mark.usefixtures("_reset_registry")]
 
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def config():
     return ProxyConfig(
         host="127.0.0.1",
@@ -34,25 +38,11 @@ def config():
         checkpoint_threshold=0.60,
         swap_threshold=0.80,
         db_path=":memory:",
+        db_backend="null",  # nothing here exercises persistence
         passthrough=False,
     )
 
 
-@pytest.fixture
-async def app(config):
-    test_client = httpx.AsyncClient(
-        base_url=config.upstream_url,
-        http2=True,
-        follow_redirects=True,
-    )
-    return await create_app(config, http_client=test_client)
-
-
-@pytest.fixture
-async def client(aiohttp_client, app):
-    return await aiohttp_client(app)
-
-
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -75,6 +65,19 @@ _COMPACT_PROMPT = (
 )
 
 
+@functools.lru_cache(maxsize=64)
+def _classify_upstream(raw: bytes) -> tuple[bool, int]:
+    """Return (is_checkpoint, message_count) for a forwarded request body.
+
+    Checkpoint requests carry a compact_20260112 context-management edit.
+    Identical bodies recur across rounds, so parses are cached.
+    """
+    body = orjson.loads(raw)
+    edits = body.get("context_management", {}).get("edits", [])
+    is_checkpoint = any(e.get("type") == "compact_20260112" for e in edits)
+    return is_checkpoint, len(body.get("messages", []))
+
+
 def _body(messages=None, compact=False):
     """Build a /v1/messages request body with consistent fingerprint.
 
@@ -99,6 +102,28 @@ def _body(messages=None, compact=False):
     return body
 
 
+# Full conversation driven by the lifecycle test; round N sends a prefix.
+_CONVERSATION = (
+    _USER_MSG, _ASST_MSG,
+    {"role": "user", "content": "more"},
+    {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
+    {"role": "user", "content": "keep going"},
+    {"role": "assistant", "content": [{"type": "text", "text": "sure"}]},
+    {"role": "user", "content": "even more"},
+    {"role": "assistant", "content": [{"type": "text", "text": "alright"}]},
+    {"role": "user", "content": "final"},
+)
+
+# Pre-serialized request bodies keyed by message count, so each round posts
+# bytes instead of re-encoding the same nested structure.
+_BODIES: dict[int, bytes] = {
+    n: orjson.dumps(_body(messages=list(_CONVERSATION[:n]))) for n in (1, 3, 5, 7)
+}
+_COMPACT_BODIES: dict[int, bytes] = {
+    n: orjson.dumps(_body(messages=list(_CONVERSATION[:n]), compact=True)) for n in (1, 9)
+}
+
+
 def _api_response(input_tokens=1000, text="Hello!"):
     """Build a mock upstream response with specified token count."""
     return {
@@ -127,14 +152,39 @@ def _checkpoint_response(summary="This is the checkpoint summary."):
     }
 
 
-def _get_mgr(client, body=None):
+# Upstream responses are pure functions of the request shape, so they are
+# built once. httpx replays a Response's in-memory content, which makes
+# the objects safe to return repeatedly.
+_LIFECYCLE_TOKENS = {
+    1: 50_000,    # Round 1: 25% → IDLE
+    3: 100_000,   # Round 2: 50% → IDLE
+    5: 130_000,   # Round 3: 65% → checkpoint triggers
+    7: 170_000,   # Round 4: 85% → SWAP_READY
+}
+_LIFECYCLE_RESPONSES = {
+    n: _json_response(orjson.dumps(_api_response(input_tokens=t)))
+    for n, t in _LIFECYCLE_TOKENS.items()
+}
+_LIFECYCLE_DEFAULT_RESPONSE = _json_response(orjson.dumps(_api_response(input_tokens=180_000)))
+_CHECKPOINT_RESPONSE = _json_response(orjson.dumps(_checkpoint_response()))
+_EMERGENCY_CHECKPOINT_RESPONSE = _json_response(
+    orjson.dumps(_checkpoint_response("emergency summary"))
+)
+_SMALL_RESPONSE = _json_response(orjson.dumps(_api_response(input_tokens=5000)))
+
+
+def _get_mgr(client, resp=None, body=None):
     """Retrieve the BufferManager for a test conversation.
 
-    If body is None, returns the first (and usually only) manager.
+    Prefers the fingerprint the proxy reports in the response headers,
+    falling back to recomputing it from body. With neither, returns the
+    first (and usually only) manager.
     """
     registry = client.app["registry"]
-    if body is not None:
+    fp = resp.headers.get("x-double-buffer-fingerprint") if resp is not None else None
+    if fp is None and body is not None:
         fp = compute_fingerprint(body)
+    if fp is not None:
         return registry.get(fp)
     # Return the single conversation in the registry
     convs = registry.all_conversations()
@@ -150,46 +200,30 @@ def _get_mgr(client, body=None):
 class TestFullLifecycle:
     """Drive a conversation through the full checkpoint → client compact lifecycle."""
 
-    @respx.mock
-    async def test_idle_to_checkpoint_to_client_compact(self, client):
+    async def test_idle_to_checkpoint_to_client_compact(self, client, upstream):
         """Full lifecycle: checkpoint triggers in background, then client compact
         request returns pre-computed checkpoint (proxy intercepts)."""
 
         def side_effect(request: httpx.Request) -> Response:
-            body = json.loads(request.content)
-
-            # Detect checkpoint request: has context_management with compact_20260112
-            ctx_mgmt = body.get("context_management", {})
-            edits = ctx_mgmt.get("edits", [])
-            is_checkpoint = any(e.get("type") == "compact_20260112" for e in edits)
+            is_checkpoint, msg_count = _classify_upstream(request.content)
             if is_checkpoint:
-                return Response(200, json=_checkpoint_response())
+                return _CHECKPOINT_RESPONSE
+            return _LIFECYCLE_RESPONSES.get(msg_count, _LIFECYCLE_DEFAULT_RESPONSE)
 
-            # Normal request — escalating tokens keyed by message count.
-            msg_count = len(body.get("messages", []))
-            token_map = {
-                1: 50_000,    # Round 1: 25% → IDLE
-                3: 100_000,   # Round 2: 50% → IDLE
-                5: 130_000,   # Round 3: 65% → checkpoint triggers
-                7: 170_000,   # Round 4: 85% → SWAP_READY
-            }
-            input_tokens = token_map.get(msg_count, 180_000)
-            return Response(200, json=_api_response(input_tokens=input_tokens))
-
-        respx.post(path="/v1/messages").mock(side_effect=side_effect)
+        upstream.mock(side_effect=side_effect)
 
         # ---------------------------------------------------------------
         # Round 1: 1 message, 50k tokens (25%) → IDLE
         # ---------------------------------------------------------------
         resp = await client.post(
             "/v1/messages",
-            json=_body(messages=[_USER_MSG]),
+            data=_BODIES[1],
             headers=HEADERS,
         )
         assert resp.status == 200
         assert resp.headers["x-double-buffer-phase"] == "IDLE"
 
-        mgr = _get_mgr(client)
+        mgr = _get_mgr(client, resp)
         assert mgr is not None
         assert mgr.phase == BufferPhase.IDLE
         assert mgr.total_input_tokens == 50_000
@@ -199,10 +233,7 @@ class TestFullLifecycle:
         # ---------------------------------------------------------------
         resp = await client.post(
             "/v1/messages",
-            json=_body(messages=[
-                _USER_MSG, _ASST_MSG,
-                {"role": "user", "content": "continue"},
-            ]),
+            data=_BODIES[3],
             headers=HEADERS,
         )
         assert resp.status == 200
@@ -215,18 +246,13 @@ class TestFullLifecycle:
         # ---------------------------------------------------------------
         resp = await client.post(
             "/v1/messages",
-            json=_body(messages=[
-                _USER_MSG, _ASST_MSG,
-                {"role": "user", "content": "more"},
-                {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
-                {"role": "user", "content": "keep going"},
-            ]),
+            data=_BODIES[5],
             headers=HEADERS,
         )
         assert resp.status == 200
 
-        # Give the background checkpoint task a moment to finalize
-        await asyncio.sleep(0.1)
+        # Wait for the background checkpoint task to finalize
+        await asyncio.wait_for(mgr.checkpoint_done.wait(), timeout=2.0)
 
         assert mgr.checkpoint_content == "This is the checkpoint summary."
         assert mgr.phase == BufferPhase.WAL_ACTIVE
@@ -237,14 +263,7 @@ class TestFullLifecycle:
         # ---------------------------------------------------------------
         resp = await client.post(
             "/v1/messages",
-            json=_body(messages=[
-                _USER_MSG, _ASST_MSG,
-                {"role": "user", "content": "more"},
-                {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
-                {"role": "user", "content": "keep going"},
-                {"role": "assistant", "content": [{"type": "text", "text": "sure"}]},
-                {"role": "user", "content": "even more"},
-            ]),
+            data=_BODIES[7],
             headers=HEADERS,
         )
         assert resp.status == 200
@@ -259,16 +278,7 @@ class TestFullLifecycle:
         # ---------------------------------------------------------------
         resp = await client.post(
             "/v1/messages",
-            json=_body(messages=[
-                _USER_MSG, _ASST_MSG,
-                {"role": "user", "content": "more"},
-                {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
-                {"role": "user", "content": "keep going"},
-                {"role": "assistant", "content": [{"type": "text", "text": "sure"}]},
-                {"role": "user", "content": "even more"},
-                {"role": "assistant", "content": [{"type": "text", "text": "alright"}]},
-                {"role": "user", "content": "final"},
-            ], compact=True),
+            data=_COMPACT_BODIES[9],
             headers=HEADERS,
         )
         assert resp.status == 200
@@ -294,11 +304,10 @@ class TestFullLifecycle:
 class TestPostSwapForwarding:
     """After swap, the client sends the compaction block back — verify forwarding."""
 
-    @respx.mock
-    async def test_compaction_block_stripped_to_text(self, client):
+    async def test_compaction_block_stripped_to_text(self, client, upstream):
         """Compaction block in subsequent request is converted to text."""
-        route = respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=_api_response(input_tokens=5000)),
+        upstream.mock(
+            return_value=_SMALL_RESPONSE,
         )
 
         # Simulate post-swap: client sends compaction block back
@@ -317,14 +326,14 @@ class TestPostSwapForwarding:
         assert resp.status == 200
 
         # Verify the forwarded request has compaction converted to text
-        forwarded = json.loads(route.calls[0].request.content)
+        forwarded = orjson.loads(upstream.calls[0].request.content)
         first_content = forwarded["messages"][0]["content"]
         assert isinstance(first_content, list)
         assert first_content[0]["type"] == "text"
         assert first_content[0]["text"] == "summary of conversation"
 
         # Manager should have reset to IDLE (incoming compaction detected)
-        mgr = _get_mgr(client)
+        mgr = _get_mgr(client, resp)
         assert mgr is not None
         assert mgr.phase == BufferPhase.IDLE
 
@@ -332,33 +341,28 @@ class TestPostSwapForwarding:
 class TestEmergencySwap:
     """When utilization jumps past both thresholds in one request."""
 
-    @respx.mock
-    async def test_emergency_skip_to_swap(self, client):
+    async def test_emergency_skip_to_swap(self, client, upstream):
         """Jumping past both thresholds runs blocking checkpoint → SWAP_READY.
         Normal requests are forwarded; client compact triggers swap."""
 
         def side_effect(request: httpx.Request) -> Response:
-            body = json.loads(request.content)
-            ctx_mgmt = body.get("context_management", {})
-            edits = ctx_mgmt.get("edits", [])
-            is_checkpoint = any(e.get("type") == "compact_20260112" for e in edits)
-
+            is_checkpoint, _ = _classify_upstream(request.content)
             if is_checkpoint:
-                return Response(200, json=_checkpoint_response("emergency summary"))
+                return _EMERGENCY_CHECKPOINT_RESPONSE
 
             # Single request at 90% utilization
-            return Response(200, json=_api_response(input_tokens=180_000))
+            return _LIFECYCLE_DEFAULT_RESPONSE
 
-        respx.post(path="/v1/messages").mock(side_effect=side_effect)
+        upstream.mock(side_effect=side_effect)
 
         resp = await client.post(
             "/v1/messages",
-            json=_body(),
+            data=_BODIES[1],
             headers=HEADERS,
         )
         assert resp.status == 200
 
-        mgr = _get_mgr(client)
+        mgr = _get_mgr(client, resp)
         assert mgr is not None
         # Emergency path: IDLE → blocking checkpoint → SWAP_READY
         assert mgr.phase == BufferPhase.SWAP_READY
@@ -367,7 +371,7 @@ class TestEmergencySwap:
         # Normal request should be forwarded (not intercepted)
         resp = await client.post(
             "/v1/messages",
-            json=_body(),
+            data=_BODIES[1],
             headers=HEADERS,
         )
         assert resp.status == 200
@@ -379,7 +383,7 @@ class TestEmergencySwap:
         # Client compact request triggers swap
         resp = await client.post(
             "/v1/messages",
-            json=_body(compact=True),
+            data=_COMPACT_BODIES[1],
             headers=HEADERS,
         )
         assert resp.status == 200
@@ -392,12 +396,11 @@ class TestEmergencySwap:
 class TestWALStitching:
     """Verify WAL messages are stitched into compaction content."""
 
-    @respx.mock
-    async def test_wal_includes_post_anchor_messages(self, client):
+    async def test_wal_includes_post_anchor_messages(self, client, upstream):
         """WAL section should contain messages after the checkpoint anchor."""
 
-        route = respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=_api_response(input_tokens=5000)),
+        upstream.mock(
+            return_value=_SMALL_RESPONSE,
         )
 
         # Make initial request to register the conversation
@@ -416,7 +419,7 @@ class TestWALStitching:
         assert resp.status == 200
 
         # Manually set up SWAP_READY with checkpoint at anchor=2 (first 2 messages)
-        mgr = _get_mgr(client)
+        mgr = _get_mgr(client, resp)
         assert mgr is not None
         mgr.phase = BufferPhase.SWAP_READY
         mgr.checkpoint_content = "Summary of first exchange."
@@ -446,14 +449,13 @@ class TestWALStitching:
         assert mgr.phase == BufferPhase.IDLE
         assert mgr.total_input_tokens == 0
 
-    @respx.mock
-    async def test_wal_preserves_tool_results_in_compact_message(self, client):
+    async def test_wal_preserves_tool_results_in_compact_message(self, client, upstream):
         """When compact prompt is appended to a user message with tool_results,
         the tool_results must survive into WAL — only the compact text block
         should be stripped."""
 
-        respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=_api_response(input_tokens=5000)),
+        upstream.mock(
+            return_value=_SMALL_RESPONSE,
         )
 
         # Conversation with tool calls — last user message has tool_result
@@ -483,7 +485,7 @@ class TestWALStitching:
         assert resp.status == 200
 
         # Force SWAP_READY with checkpoint at anchor=2
-        mgr = _get_mgr(client)
+        mgr = _get_mgr(client, resp)
         assert mgr is not None
         mgr.phase = BufferPhase.SWAP_READY
         mgr.checkpoint_content = "Summary so far."
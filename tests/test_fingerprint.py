@@ -1,9 +1,13 @@
 """Tests for conversation fingerprinting."""
 
+import json
+
 from dbproxy.identity.fingerprint import (
     SYSTEM_PREFIX_LENGTH,
     _extract_session_id,
     _fallback_fingerprint,
+    _json_list_prefix,
+    _session_id_from_user_id,
     compute_fingerprint,
 )
 
@@ -85,6 +89,29 @@ class TestComputeFingerprint:
 class TestFallbackFingerprint:
     """Tests for the hash-based fallback when metadata is unavailable."""
 
+    def test_known_values_stable(self):
+        # Fallback fingerprints are persisted — they must not drift.
+        assert _fallback_fingerprint({
+            "system": "You are helpful",
+            "messages": [{"role": "user", "content": "hello"}],
+        }) == "cc0b901a5a816db3f2090523b203d045cb18b8ec9a71c6afcb94103d719f9ba1"
+        assert _fallback_fingerprint({
+            "system": [{"type": "text", "text": "You are helpful"}],
+            "messages": [
+                {"role": "assistant", "content": "x"},
+                {"role": "user", "content": [{"type": "text", "text": "hello"}]},
+            ],
+        }) == "d3979f7dffef83177729a654f94352be3f495789b954b10b97f569fc2b108144"
+        assert _fallback_fingerprint({
+            "messages": [{"role": "user", "content": "hello"}],
+        }) == "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+
+    def test_list_system_prefix_matches_full_serialization(self):
+        blocks = [{"type": "text", "text": "a" * 700}, {"type": "text", "text": "b" * 700}]
+        assert _json_list_prefix(blocks, SYSTEM_PREFIX_LENGTH) == (
+            json.dumps(blocks, sort_keys=True)[:SYSTEM_PREFIX_LENGTH]
+        )
+
     def test_same_input_same_hash(self):
         body = {
             "system": "You are helpful",
@@ -177,3 +204,10 @@ class TestFallbackFingerprint:
             "messages": [{"role": "user", "content": "hello"}],
         }
         assert _fallback_fingerprint(body1) != _fallback_fingerprint(body2)
+
+
+class TestFingerprintMemoization:
+    def test_user_id_without_session_skips_regex(self):
+        misses = _session_id_from_user_id.cache_info().misses
+        assert _extract_session_id({"metadata": {"user_id": "user_abc_account_def"}}) is None
+        assert _session_id_from_user_id.cache_info().misses == misses
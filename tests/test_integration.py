@@ -1,17 +1,21 @@
 """Integration tests for the proxy server with mock upstream."""
 
-import json
+import functools
 
+import orjson
 import pytest
-import httpx
-import respx
 from httpx import Response
 
+from dbproxy.buffer.state_machine import BufferPhase
 from dbproxy.config import ProxyConfig
-from dbproxy.server import create_app
 
+from .conftest import _json_response
 
-@pytest.fixture
+# Keep the module-scoped app/server on a single xdist worker (--dist loadgroup)
+pytestmark = [pytest.mark.xdist_group("integration"), pytest.mark.usefixtures("_reset_registry")]
+
+
+@pytest.fixture(scope="module")
 def config():
     return ProxyConfig(
         host="127.0.0.1",
@@ -20,26 +24,11 @@ def config():
         checkpoint_threshold=0.70,
         swap_threshold=0.95,
         db_path=":memory:",
+        db_backend="null",  # nothing here exercises persistence
         passthrough=False,
     )
 
 
-@pytest.fixture
-async def app(config):
-    # Use a plain httpx client (no custom transport) so respx can intercept
-    test_client = httpx.AsyncClient(
-        base_url=config.upstream_url,
-        http2=True,
-        follow_redirects=True,
-    )
-    return await create_app(config, http_client=test_client)
-
-
-@pytest.fixture
-async def client(aiohttp_client, app):
-    return await aiohttp_client(app)
-
-
 # The prompt Claude Code sends when requesting compaction.
 _COMPACT_PROMPT = (
     "Your task is to create a detailed summary of the conversation so far, "
@@ -91,13 +80,61 @@ def _mock_api_response(
     }
 
 
-def _mock_upstream(mock_resp=None):
-    """Mock any POST to /v1/messages regardless of host (matches resolved IP)."""
-    if mock_resp is None:
-        mock_resp = _mock_api_response()
-    return respx.post(path="/v1/messages").mock(
-        return_value=Response(200, json=mock_resp)
+@functools.lru_cache(maxsize=32)
+def _cached_response_bytes(content_text="Hello!", input_tokens=1000, output_tokens=50):
+    return orjson.dumps(_mock_api_response(content_text, input_tokens, output_tokens))
+
+
+# Most tests send the default body (or its compact variant) and expect the
+# default upstream reply, so both sides are encoded once.
+_HEADERS = {"x-api-key": "test-key", "content-type": "application/json"}
+_DEFAULT_REQUEST = _make_messages_request()
+_DEFAULT_BODY = orjson.dumps(_DEFAULT_REQUEST)
+_COMPACT_BODY = orjson.dumps(_make_messages_request(compact=True))
+_DEFAULT_API_RESPONSE = _json_response(_cached_response_bytes())
+
+
+def _assert_compact_prompt_in_last_user_turn(content: bytes) -> None:
+    last_msg = orjson.loads(content)["messages"][-1]
+    assert last_msg["role"] == "user"
+    assert "create a detailed summary of the conversation" in last_msg["content"].lower()
+
+
+async def _post_messages(client, body: bytes):
+    return await client.post("/v1/messages", data=body, headers=_HEADERS)
+
+
+def _mock_upstream(route, **overrides):
+    """Answer the upstream /v1/messages route with a fixed response.
+
+    ``overrides`` are ``_mock_api_response`` keyword arguments; the encoded
+    body is cached per distinct set of values.
+    """
+    if not overrides:
+        return route.mock(return_value=_DEFAULT_API_RESPONSE)
+    return route.mock(return_value=_json_response(_cached_response_bytes(**overrides)))
+
+
+def _seed_manager(client, phase, checkpoint_content):
+    """Register the default conversation directly, skipping a warm-up request.
+
+    The manager comes from the handler's own ``manager_for`` and gets the
+    request context a forwarded request would give it. The compact body
+    shares the default body's fingerprint, so the proxy picks this manager
+    up for either; tests confirm that with ``_get_mgr``.
+    """
+    mgr = client.app["message_handler"].manager_for(_DEFAULT_REQUEST, _DEFAULT_REQUEST["model"])
+    mgr.update_from_request(
+        _DEFAULT_REQUEST, {"x-api-key": _HEADERS["x-api-key"], "_query_string": ""},
     )
+    mgr.phase = phase
+    mgr.checkpoint_content = checkpoint_content
+    return mgr
+
+
+def _get_mgr(client, resp):
+    """Look up the manager via the fingerprint the proxy reported for resp."""
+    return client.app["registry"].get(resp.headers["x-double-buffer-fingerprint"])
 
 
 class TestHealthEndpoint:
@@ -111,132 +148,101 @@ class TestHealthEndpoint:
 
 class TestPassthrough:
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_non_streaming_passthrough(self, client):
-        mock_resp = _mock_api_response()
-        _mock_upstream(mock_resp)
-
-        body = _make_messages_request()
-        resp = await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+    async def test_non_streaming_passthrough(self, client, upstream):
+        _mock_upstream(upstream)
+
+        resp = await _post_messages(client, _DEFAULT_BODY)
         assert resp.status == 200
         data = await resp.json()
         assert data["content"][0]["text"] == "Hello!"
+        assert upstream.call_count == 1
+        assert str(upstream.calls.last.request.url) == "https://api.anthropic.com/v1/messages"
+
+    @pytest.mark.asyncio
+    async def test_api_passthrough_filters_hop_headers(self, client, upstream_models):
+        upstream_models.mock(
+            return_value=Response(
+                200,
+                json={"data": []},
+                headers=[
+                    ("connection", "keep-alive"),
+                    ("upgrade", "h2c"),
+                    ("set-cookie", "a=1"),
+                    ("set-cookie", "b=2"),
+                ],
+            )
+        )
+
+        resp = await client.get("/v1/models")
+        assert resp.status == 200
+        assert "upgrade" not in resp.headers
+        assert resp.headers.getall("set-cookie") == ["a=1", "b=2"]
 
 
 class TestCompactForwarding:
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_compact_prompt_preserved_for_native_forward(self, client):
+    async def test_compact_prompt_preserved_for_native_forward(self, client, upstream):
         """When no checkpoint available, compact request is forwarded with
         the compact prompt intact so the API generates the summary."""
-        route = respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=_mock_api_response(
-                content_text="Here is a summary of the conversation."
-            )),
-        )
+        route = _mock_upstream(upstream, content_text="Here is a summary of the conversation.")
 
-        body = _make_messages_request(compact=True)
-        resp = await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _COMPACT_BODY)
         assert resp.status == 200
 
         # Verify the forwarded request has the compact prompt intact
-        forwarded_body = json.loads(route.calls[0].request.content)
-        last_msg = forwarded_body["messages"][-1]
-        assert last_msg["role"] == "user"
-        assert "create a detailed summary of the conversation" in last_msg["content"].lower()
+        _assert_compact_prompt_in_last_user_turn(route.calls[0].request.content)
 
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_compact_edit_stripped_from_non_compact_request(self, client):
+    async def test_compact_edit_stripped_from_non_compact_request(self, client, upstream):
         """Non-compact requests have any stray compact edits stripped."""
-        mock_resp = _mock_api_response()
-        route = _mock_upstream(mock_resp)
+        route = _mock_upstream(upstream)
 
         # Normal request (no compact=True) — compact edit should be stripped
-        body = _make_messages_request()
-        resp = await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _DEFAULT_BODY)
         assert resp.status == 200
 
         # Verify no context_management in forwarded request
-        forwarded_body = json.loads(route.calls[0].request.content)
+        forwarded_body = orjson.loads(route.calls[0].request.content)
         assert "context_management" not in forwarded_body
 
 
 class TestBufferHeaders:
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_response_has_buffer_headers(self, client):
-        _mock_upstream()
-
-        body = _make_messages_request()
-        resp = await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+    async def test_response_has_buffer_headers(self, client, upstream):
+        _mock_upstream(upstream)
+
+        resp = await _post_messages(client, _DEFAULT_BODY)
         assert "x-double-buffer-phase" in resp.headers
         assert "x-double-buffer-conv-id" in resp.headers
+        fingerprint = resp.headers["x-double-buffer-fingerprint"]
+        assert fingerprint.startswith(resp.headers["x-double-buffer-conv-id"])
 
 
 class TestResetEndpoint:
     @pytest.mark.asyncio
     async def test_reset_all(self, client):
-        resp = await client.post("/v1/_reset", json={})
+        resp = await client.post("/v1/_reset", data=b"{}", headers=_HEADERS)
         assert resp.status == 200
         data = await resp.json()
         assert data["status"] == "reset_all"
 
     @pytest.mark.asyncio
     async def test_reset_nonexistent(self, client):
-        resp = await client.post("/v1/_reset", json={"conv_id": "nonexistent"})
+        resp = await client.post("/v1/_reset", data=b'{"conv_id": "nonexistent"}', headers=_HEADERS)
         assert resp.status == 404
 
 
 class TestClientCompactExecution:
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_client_compact_with_checkpoint_returns_synthetic(self, client):
+    async def test_client_compact_with_checkpoint_returns_synthetic(self, client, upstream):
         """When checkpoint is ready, client compact request returns pre-computed summary."""
-        _mock_upstream()
-
-        body = _make_messages_request()
-        await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
-
-        # Manually set the manager to SWAP_READY with checkpoint content
-        registry = client.app["registry"]
-        from dbproxy.identity.fingerprint import compute_fingerprint
-        fp = compute_fingerprint(body)
-        mgr = registry.get(fp)
-        assert mgr is not None
-
-        from dbproxy.buffer.state_machine import BufferPhase
-        mgr.phase = BufferPhase.SWAP_READY
-        mgr.checkpoint_content = "This is the checkpoint summary"
+        mgr = _seed_manager(client, BufferPhase.SWAP_READY, "This is the checkpoint summary")
 
         # Client sends compact request → proxy intercepts with pre-computed checkpoint
-        compact_body = _make_messages_request(compact=True)
-        resp = await client.post(
-            "/v1/messages",
-            json=compact_body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _COMPACT_BODY)
         assert resp.status == 200
+        assert upstream.call_count == 0  # answered locally, no response mocked
+        assert _get_mgr(client, resp) is mgr
         data = await resp.json()
         assert data["stop_reason"] == "end_turn"
         assert data["content"][0]["type"] == "text"
@@ -246,106 +252,48 @@ class TestClientCompactExecution:
         assert mgr.phase == BufferPhase.IDLE
 
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_normal_request_forwarded_when_swap_ready(self, client):
+    async def test_normal_request_forwarded_when_swap_ready(self, client, upstream):
         """When SWAP_READY, a normal (non-compact) request is forwarded normally."""
-        _mock_upstream()
-
-        body = _make_messages_request()
-        await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
-
-        # Set SWAP_READY
-        registry = client.app["registry"]
-        from dbproxy.identity.fingerprint import compute_fingerprint
-        fp = compute_fingerprint(body)
-        mgr = registry.get(fp)
-        assert mgr is not None
-
-        from dbproxy.buffer.state_machine import BufferPhase
-        mgr.phase = BufferPhase.SWAP_READY
-        mgr.checkpoint_content = "This is the checkpoint summary"
+        _mock_upstream(upstream)
+        mgr = _seed_manager(client, BufferPhase.SWAP_READY, "This is the checkpoint summary")
 
         # Normal request (no compact) — should be forwarded, not intercepted
-        resp = await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _DEFAULT_BODY)
         assert resp.status == 200
+        assert _get_mgr(client, resp) is mgr
         data = await resp.json()
         # Should be a normal response, NOT compaction
         assert data["stop_reason"] == "end_turn"
         assert data["content"][0]["type"] == "text"
 
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_client_compact_no_checkpoint_forwards_native(self, client):
+    async def test_client_compact_no_checkpoint_forwards_native(self, client, upstream):
         """When no checkpoint available, compact request is forwarded to API natively."""
         # Mock upstream to return a regular text response (as the API does for compact)
-        summary_resp = _mock_api_response(
-            content_text="Summary of the conversation so far.",
-            input_tokens=1000,
-        )
-        route = respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=summary_resp),
+        route = _mock_upstream(
+            upstream, content_text="Summary of the conversation so far.", input_tokens=1000,
         )
 
         # Send compact request when in IDLE (no checkpoint)
-        compact_body = _make_messages_request(compact=True)
-        resp = await client.post(
-            "/v1/messages",
-            json=compact_body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _COMPACT_BODY)
         assert resp.status == 200
 
         # Verify the forwarded request has the compact prompt intact
-        forwarded = json.loads(route.calls[0].request.content)
-        last_msg = forwarded["messages"][-1]
-        assert last_msg["role"] == "user"
-        assert "create a detailed summary of the conversation" in last_msg["content"].lower()
+        _assert_compact_prompt_in_last_user_turn(route.calls[0].request.content)
 
     @pytest.mark.asyncio
-    @respx.mock
-    async def test_native_compact_resets_manager(self, client):
+    async def test_native_compact_resets_manager(self, client, upstream):
         """After forwarding a native compact request, manager resets to IDLE."""
-        route = respx.post(path="/v1/messages").mock(
-            return_value=Response(200, json=_mock_api_response(
-                content_text="Summary.", input_tokens=1000,
-            )),
-        )
+        _mock_upstream(upstream, content_text="Summary.", input_tokens=1000)
 
-        # First request to register conversation
-        body = _make_messages_request()
-        await client.post(
-            "/v1/messages",
-            json=body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
-
-        # Set manager to WAL_ACTIVE (has checkpoint but hasn't reached swap threshold)
-        registry = client.app["registry"]
-        from dbproxy.identity.fingerprint import compute_fingerprint
-        from dbproxy.buffer.state_machine import BufferPhase
-        fp = compute_fingerprint(body)
-        mgr = registry.get(fp)
-        assert mgr is not None
-        mgr.phase = BufferPhase.WAL_ACTIVE
-        mgr.checkpoint_content = "old checkpoint"
+        # WAL_ACTIVE: has a checkpoint but hasn't reached the swap threshold
+        mgr = _seed_manager(client, BufferPhase.WAL_ACTIVE, "old checkpoint")
 
         # Send compact request — should forward natively (WAL_ACTIVE → handle_client_compact
         # promotes to SWAP_READY, then execute_swap returns synthetic)
-        compact_body = _make_messages_request(compact=True)
-        resp = await client.post(
-            "/v1/messages",
-            json=compact_body,
-            headers={"x-api-key": "test-key", "content-type": "application/json"},
-        )
+        resp = await _post_messages(client, _COMPACT_BODY)
         assert resp.status == 200
+        assert _get_mgr(client, resp) is mgr
 
         # Manager resets after swap
         assert mgr.phase == BufferPhase.IDLE
@@ -1,60 +1,81 @@
 """Tests for conversation registry."""
 
-import time
+import pytest
 
 from dbproxy.identity.registry import ConversationRegistry
 
 
-class TestConversationRegistry:
-    def test_get_or_create_new(self):
-        reg = ConversationRegistry()
-        mgr = reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        assert mgr.conv_id == "fp1"
-        assert len(reg) == 1
+SONNET = "claude-sonnet-4-6"
 
-    def test_get_or_create_existing(self):
-        reg = ConversationRegistry()
-        mgr1 = reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        mgr2 = reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        assert mgr1 is mgr2
-        assert len(reg) == 1
 
-    def test_get_existing(self):
-        reg = ConversationRegistry()
-        reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        mgr = reg.get("fp1")
-        assert mgr is not None
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
 
-    def test_get_nonexistent(self):
-        reg = ConversationRegistry()
-        assert reg.get("nonexistent") is None
+    def __call__(self) -> float:
+        return self.now
 
-    def test_remove(self):
-        reg = ConversationRegistry()
-        reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        reg.remove("fp1")
-        assert len(reg) == 0
-        assert reg.get("fp1") is None
 
-    def test_expire_stale(self):
-        reg = ConversationRegistry(ttl_seconds=0)  # Expire immediately
-        reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        key = "fp1:claude-sonnet-4-6"
-        reg._last_seen[key] = time.time() - 1  # Force stale
-        expired = reg.expire_stale()
-        assert key in expired
-        assert len(reg) == 0
+@pytest.fixture(scope="module")
+def clock():
+    return _FakeClock()
 
-    def test_all_conversations(self):
-        reg = ConversationRegistry()
-        reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
-        reg.get_or_create("fp2", "claude-opus-4-6", 200_000)
-        all_convs = reg.all_conversations()
-        assert len(all_convs) == 2
 
-    def test_different_models_separate_managers(self):
+@pytest.fixture(scope="module")
+def _shared_reg(clock):
+    return ConversationRegistry(ttl_seconds=60, clock=clock)
+
+
+@pytest.fixture
+def fresh_reg(_shared_reg):
+    """One registry per module, emptied before each test."""
+    _shared_reg.clear()
+    return _shared_reg
+
+
+class TestConversationRegistry:
+    @pytest.mark.parametrize(
+        "created, removed, lookup, found, expected_len",
+        [
+            pytest.param([], [], "nonexistent", False, 0, id="get_nonexistent"),
+            pytest.param(["fp1"], ["fp1"], "fp1", False, 0, id="remove"),
+            pytest.param(["fp1", "fp2"], [], "fp2", True, 2, id="all_conversations"),
+        ],
+    )
+    def test_lookup(self, fresh_reg, created, removed, lookup, found, expected_len):
+        for fp in created:
+            fresh_reg.get_or_create(fp, SONNET, 200_000)
+        for fp in removed:
+            fresh_reg.remove(fp)
+        assert (fresh_reg.get(lookup) is not None) is found
+        assert len(fresh_reg) == expected_len
+        assert len(fresh_reg.all_conversations()) == expected_len
+
+    def test_get_or_create_new(self, fresh_reg):
+        mgr = fresh_reg.get_or_create("fp1", SONNET, 200_000)
+        assert mgr.conv_id == "fp1"
+        assert fresh_reg.get("fp1") is mgr
+
+    def test_get_or_create_existing(self, fresh_reg):
+        mgr1 = fresh_reg.get_or_create("fp1", SONNET, 200_000)
+        mgr2 = fresh_reg.get_or_create("fp1", SONNET, 200_000)
+        assert mgr1 is mgr2
+        assert len(fresh_reg) == 1
+
+    def test_expire_stale(self, fresh_reg, clock):
+        reg = fresh_reg
+        reg.get_or_create("fp1", SONNET, 200_000)
+        clock.now += 30
+        reg.get_or_create("fp2", SONNET, 200_000)
+        clock.now += 31
+        expired = reg.expire_stale()
+        assert expired == [f"fp1:{SONNET}"]
+        assert len(reg) == 1
+        assert reg.get("fp2") is not None
+
+    def test_different_models_separate_managers(self, fresh_reg):
         """Same fingerprint but different models get separate managers."""
-        reg = ConversationRegistry()
+        reg = fresh_reg
         mgr_opus = reg.get_or_create("fp1", "claude-opus-4-6", 200_000)
         mgr_haiku = reg.get_or_create("fp1", "claude-haiku-4-5-20251001", 200_000)
         assert mgr_opus is not mgr_haiku
@@ -63,3 +84,20 @@ class TestConversationRegistry:
         mgr_opus.total_input_tokens = 160_000
         mgr_haiku.total_input_tokens = 5_000
         assert mgr_opus.total_input_tokens == 160_000
+
+    def test_state_change_callback_installed_on_new_managers(self):
+        async def cb(mgr):
+            pass
+
+        reg = ConversationRegistry(state_change_cb=cb)
+        mgr = reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
+        assert mgr._on_state_change is cb
+
+    def test_clear(self, fresh_reg):
+        reg = fresh_reg
+        reg.get_or_create("fp1", "claude-sonnet-4-6", 200_000)
+        reg.get_or_create("fp2", "claude-sonnet-4-6", 200_000)
+        reg.clear()
+        assert len(reg) == 0
+        assert reg.get("fp1") is None
+        assert reg.expire_stale() == []
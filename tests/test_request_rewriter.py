@@ -58,6 +58,15 @@ class TestStripCompactEdit:
         strip_compact_edit(body)
         assert len(body["context_management"]["edits"]) == original_len
 
+    def test_messages_list_shared_by_identity(self):
+        body = _make_body(context_management={
+            "edits": [{"type": "compact_20260112"}, {"type": "other_edit"}]
+        })
+        result = strip_compact_edit(body)
+        assert result is not body
+        assert result["messages"] is body["messages"]
+        assert result["context_management"] is not body["context_management"]
+
     def test_no_compact_edit_returns_same(self):
         body = _make_body(context_management={
             "edits": [{"type": "clear_thinking_20251015"}]
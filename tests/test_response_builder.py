@@ -2,35 +2,48 @@
 
 import json
 
+import pytest
+
 from dbproxy.proxy.response_builder import (
     build_compaction_json,
     build_compaction_sse_events,
 )
 
 
+SAMPLE_SUMMARY = "my summary"
+MODEL = "claude-sonnet-4-6"
+
+
+@pytest.fixture(scope="module")
+def compaction_json():
+    return build_compaction_json(SAMPLE_SUMMARY, MODEL)
+
+
+@pytest.fixture(scope="module")
+def sse_events():
+    """Built once; the tests below only read the events."""
+    return build_compaction_sse_events(SAMPLE_SUMMARY, MODEL)
+
+
 class TestBuildCompactionJson:
-    def test_structure(self):
-        result = build_compaction_json("summary text", "claude-sonnet-4-6")
-        assert result["type"] == "message"
-        assert result["role"] == "assistant"
-        assert result["stop_reason"] == "end_turn"
-        assert result["model"] == "claude-sonnet-4-6"
-        assert len(result["content"]) == 1
-        assert result["content"][0]["type"] == "text"
-        assert result["content"][0]["text"] == "summary text"
-        assert result["usage"]["input_tokens"] == 0
-        assert result["usage"]["output_tokens"] > 0
-
-    def test_id_prefix(self):
-        result = build_compaction_json("test", "claude-sonnet-4-6")
-        assert result["id"].startswith("msg_dbproxy_")
+    def test_structure(self, compaction_json):
+        assert compaction_json["type"] == "message"
+        assert compaction_json["role"] == "assistant"
+        assert compaction_json["stop_reason"] == "end_turn"
+        assert compaction_json["model"] == MODEL
+        assert len(compaction_json["content"]) == 1
+        assert compaction_json["content"][0]["type"] == "text"
+        assert compaction_json["content"][0]["text"] == SAMPLE_SUMMARY
+        assert compaction_json["usage"]["input_tokens"] == 0
+        assert compaction_json["usage"]["output_tokens"] > 0
+
+    def test_id_prefix(self, compaction_json):
+        assert compaction_json["id"].startswith("msg_dbproxy_")
 
 
 class TestBuildCompactionSSEEvents:
-    def test_event_sequence(self):
-        events = build_compaction_sse_events("summary", "claude-sonnet-4-6")
-        event_types = [e.event for e in events]
-        assert event_types == [
+    def test_sse_contract(self, sse_events):
+        assert [e.event for e in sse_events] == [
             "message_start",
             "content_block_start",
             "content_block_delta",
@@ -38,29 +51,20 @@ class TestBuildCompactionSSEEvents:
             "message_delta",
             "message_stop",
         ]
+        data = [json.loads(e.data) for e in sse_events]
+        assert data[1]["content_block"]["type"] == "text"
+        assert data[2]["delta"]["type"] == "text_delta"
+        assert data[2]["delta"]["text"] == SAMPLE_SUMMARY
+        assert data[4]["delta"]["stop_reason"] == "end_turn"
 
-    def test_text_content_in_delta(self):
-        events = build_compaction_sse_events("my summary", "claude-sonnet-4-6")
-        delta_event = events[2]  # content_block_delta
-        data = json.loads(delta_event.data)
-        assert data["delta"]["type"] == "text_delta"
-        assert data["delta"]["text"] == "my summary"
-
-    def test_stop_reason_end_turn(self):
-        events = build_compaction_sse_events("test", "claude-sonnet-4-6")
-        msg_delta = events[4]  # message_delta
-        data = json.loads(msg_delta.data)
-        assert data["delta"]["stop_reason"] == "end_turn"
-
-    def test_content_block_type_text(self):
-        events = build_compaction_sse_events("test", "claude-sonnet-4-6")
-        block_start = events[1]
-        data = json.loads(block_start.data)
-        assert data["content_block"]["type"] == "text"
-
-    def test_events_serializable(self):
-        events = build_compaction_sse_events("test", "claude-sonnet-4-6")
-        for event in events:
+    def test_events_serializable(self, sse_events):
+        for event in sse_events:
             raw = event.to_bytes()
             assert isinstance(raw, bytes)
             assert len(raw) > 0
+
+    def test_matches_json_schema(self, sse_events, compaction_json):
+        # Both shapes present the summary as a plain text turn
+        data = [json.loads(e.data) for e in sse_events]
+        assert data[1]["content_block"]["type"] == compaction_json["content"][0]["type"]
+        assert data[4]["delta"]["stop_reason"] == compaction_json["stop_reason"]
@@ -0,0 +1,56 @@
+"""Tests for SSE forwarder."""
+
+import pytest
+
+from dbproxy.proxy.sse_forwarder import SSEForwarder
+
+
+class _FakeResponse:
+    def __init__(self):
+        self.written: list[bytes] = []
+
+    async def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+
+async def _aiter(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+_STREAM = [
+    b'event: message_start\ndata: {"type":"message_start","message":'
+    b'{"usage":{"input_tokens":10}}}\n\n',
+    b'event: content_block_start\ndata: {"type":"content_block_start",'
+    b'"index":0,"content_block":{"type":"text","text":""}}\n\nevent: content_bl',
+    b'ock_delta\ndata: {"type":"content_block_delta","index":0,'
+    b'"delta":{"type":"text_delta","text":"caf\xc3',
+    b'\xa9"}}\n\nevent: content_block_stop\ndata: {"type":"content_block_stop","index":0}\n\n',
+    b'event: message_delta\ndata: {"type":"message_delta","delta":'
+    b'{"stop_reason":"end_turn"},"usage":{"output_tokens":5}}\n\n',
+]
+
+
+class TestForwardStream:
+    @pytest.mark.asyncio
+    async def test_chunks_forwarded_verbatim(self):
+        fwd = SSEForwarder(conv_id="test")
+        resp = _FakeResponse()
+        await fwd.forward_stream(_aiter(_STREAM), resp)
+        assert b"".join(resp.written) == b"".join(_STREAM)
+
+    @pytest.mark.asyncio
+    async def test_metadata_extracted(self):
+        fwd = SSEForwarder(conv_id="test")
+        await fwd.forward_stream(_aiter(_STREAM), _FakeResponse())
+        assert fwd.usage == {"input_tokens": 10, "output_tokens": 5}
+        assert fwd.stop_reason == "end_turn"
+        # Multi-byte character split across chunks is decoded intact
+        assert fwd.content_blocks[0]["text"] == "café"
+        assert not fwd.has_compaction
+
+    @pytest.mark.asyncio
+    async def test_buffer_overflow(self):
+        fwd = SSEForwarder(conv_id="test")
+        with pytest.raises(RuntimeError, match="overflow"):
+            await fwd.forward_stream(_aiter(_STREAM), _FakeResponse(), max_buffer_bytes=100)
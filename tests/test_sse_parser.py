@@ -21,6 +21,12 @@ class TestSSEEvent:
         result = event.to_bytes()
         assert b"id: 42\n" in result
 
+    def test_to_bytes_parts_join(self):
+        events = [SSEEvent(event="a", data="1\n2", retry=3000), SSEEvent(data="é")]
+        joined = b"".join(part for event in events for part in event.to_bytes_parts())
+        assert joined == b"".join(e.to_bytes() for e in events)
+        assert joined == "event: a\ndata: 1\ndata: 2\nretry: 3000\n\ndata: é\n\n".encode()
+
     def test_is_empty(self):
         assert SSEEvent().is_empty
         assert not SSEEvent(event="test").is_empty
@@ -51,6 +57,19 @@ class TestSSEParser:
         assert events[0].event == "test"
         assert events[0].data == "hello"
 
+    def test_crlf_and_empty_data_line_across_chunks(self):
+        parser = SSEParser()
+        assert parser.feed("data:\r") == []
+        assert parser.feed("\ndata: x\r\n") == []
+        events = parser.feed("\r\n")
+        assert len(events) == 1
+        assert events[0].data == "\nx"
+
+    def test_unicode_line_separator_kept_in_data(self):
+        parser = SSEParser()
+        events = parser.feed('data: {"text":"a\u2028b\x85c"}\n\n')
+        assert events[0].data == '{"text":"a\u2028b\x85c"}'
+
     def test_multiline_data(self):
         parser = SSEParser()
         events = parser.feed("data: line1\ndata: line2\n\n")
@@ -1,8 +1,11 @@
 """Tests for buffer state machine."""
 
+import itertools
+
 import pytest
 
 from dbproxy.buffer.state_machine import (
+    VALID_TRANSITIONS,
     BufferPhase,
     InvalidTransition,
     transition,
@@ -55,6 +58,16 @@ class TestInvalidTransitions:
         with pytest.raises(InvalidTransition):
             validate_transition(BufferPhase.SWAP_EXECUTING, BufferPhase.SWAP_READY)
 
+    @pytest.mark.parametrize(
+        "from_phase, to_phase", list(itertools.product(BufferPhase, BufferPhase)),
+    )
+    def test_matches_valid_transitions_table(self, from_phase, to_phase):
+        if (from_phase, to_phase) in VALID_TRANSITIONS:
+            validate_transition(from_phase, to_phase)
+        else:
+            with pytest.raises(InvalidTransition):
+                validate_transition(from_phase, to_phase)
+
 
 class TestTransition:
     def test_returns_new_phase(self):
@@ -8,6 +8,7 @@ from dbproxy.buffer.swap import (
     format_compaction_with_wal,
     serialize_swap_response_bytes,
 )
+from dbproxy.proxy.response_builder import build_compaction_sse_events
 
 
 class TestSerializeMessage:
@@ -60,6 +61,14 @@ class TestSerializeMessage:
         # Compact JSON of input is truncated to 150 chars
         assert len(result) < 250
 
+    def test_tool_use_input_beyond_orjson(self):
+        # Ints past 64 bits and non-ASCII text still serialize (ASCII-escaped)
+        msg = {"role": "assistant", "content": [
+            {"type": "tool_use", "name": "calc", "input": {"n": 2**70, "s": "\u00e9"}},
+        ]}
+        result = _serialize_message(msg)
+        assert '[tool_use: calc({"n":1180591620717411303424,"s":"\\u00e9"})]' in result
+
     def test_tool_result_truncation(self):
         msg = {"role": "user", "content": [
             {"type": "tool_result", "content": "y" * 1000},
@@ -142,7 +151,6 @@ class TestSerializeSwapResponseBytes:
         assert parsed["type"] == "message"
 
     def test_sse_response(self):
-        from dbproxy.proxy.response_builder import build_compaction_sse_events
         events = build_compaction_sse_events("test", "claude-sonnet-4-6")
         result = serialize_swap_response_bytes(events, stream=True)
         assert isinstance(result, bytes)
@@ -0,0 +1,93 @@
+"""Tests for TLS certificate generation."""
+
+import os
+import subprocess
+
+from dbproxy import tls
+from dbproxy.tls import (
+    CA_CERT_FILE,
+    SERVER_CERT_FILE,
+    SERVER_KEY_FILE,
+    _build_server_ssl_context,
+    _resolve_certs,
+    create_server_ssl_context,
+    generate_certs,
+    install_ca_system_trust,
+)
+
+
+class TestGenerateCerts:
+    def setup_method(self):
+        _resolve_certs.cache_clear()
+
+    def test_generates_all_files(self, tmp_path):
+        ca_dir = str(tmp_path / "certs")
+        ca_path, cert_path, key_path = generate_certs(ca_dir)
+        assert ca_path == os.path.join(ca_dir, CA_CERT_FILE)
+        assert cert_path == os.path.join(ca_dir, SERVER_CERT_FILE)
+        assert key_path == os.path.join(ca_dir, SERVER_KEY_FILE)
+        for path in (ca_path, cert_path, key_path):
+            assert os.path.getsize(path) > 0
+
+    def test_uses_ecdsa_keys(self, tmp_path):
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+        _, _, key_path = generate_certs(str(tmp_path))
+        with open(key_path, "rb") as f:
+            key = load_pem_private_key(f.read(), password=None)
+        assert isinstance(key, ec.EllipticCurvePrivateKey)
+
+    def test_existing_certs_not_regenerated(self, tmp_path):
+        ca_dir = str(tmp_path)
+        ca_path, _, _ = generate_certs(ca_dir)
+        with open(ca_path, "rb") as f:
+            original = f.read()
+
+        _resolve_certs.cache_clear()
+        generate_certs(ca_dir)
+        with open(ca_path, "rb") as f:
+            assert f.read() == original
+
+    def test_memoized_per_dir(self, tmp_path):
+        ca_dir = str(tmp_path)
+        first = generate_certs(ca_dir)
+        assert generate_certs(ca_dir) == first
+        assert _resolve_certs.cache_info().hits == 1
+
+
+class TestServerSSLContext:
+    def setup_method(self):
+        _resolve_certs.cache_clear()
+        _build_server_ssl_context.cache_clear()
+
+    def test_context_shared_until_cert_changes(self, tmp_path):
+        _, cert_path, key_path = generate_certs(str(tmp_path))
+        ctx = create_server_ssl_context(cert_path, key_path)
+        assert create_server_ssl_context(cert_path, key_path) is ctx
+
+        stat = os.stat(cert_path)
+        os.utime(cert_path, (stat.st_atime, stat.st_mtime + 10))
+        assert create_server_ssl_context(cert_path, key_path) is not ctx
+
+
+class TestInstallCaSystemTrust:
+    def test_skips_update_when_unchanged(self, tmp_path, monkeypatch):
+        ca_path = tmp_path / "ca.pem"
+        ca_path.write_bytes(b"CA")
+        dest = tmp_path / "installed.crt"
+        monkeypatch.setattr(tls, "SYSTEM_CA_DEST", str(dest))
+        calls = []
+        monkeypatch.setattr(subprocess, "run", lambda *a, **kw: calls.append(a))
+
+        install_ca_system_trust(str(ca_path))
+        assert dest.read_bytes() == b"CA"
+        assert len(calls) == 1
+
+        install_ca_system_trust(str(ca_path))
+        assert len(calls) == 1
+
+        ca_path.write_bytes(b"NEW CA")
+        install_ca_system_trust(str(ca_path))
+        assert dest.read_bytes() == b"NEW CA"
+        assert len(calls) == 2
@@ -15,14 +15,20 @@ Claude Code must be running in a tmux session.
 
 from __future__ import annotations
 
-import json
+import http.client
+import math
 import os
+import re
 import subprocess
 import sys
-import tempfile
 import time
 import ssl
-import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass
+
+import orjson
+
+from _tmux_ctl import TmuxControl, quote
 
 # ---------------------------------------------------------------------------
 # Config
@@ -49,6 +55,9 @@ SSL_CTX = ssl.create_default_context()
 SSL_CTX.check_hostname = False
 SSL_CTX.verify_mode = ssl.CERT_NONE
 
+# Pane polling and input go over one tmux control-mode connection
+_TMUX = TmuxControl(TMUX_SESSION)
+
 
 def log(msg: str) -> None:
     print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
@@ -59,122 +68,215 @@ def fail(msg: str) -> None:
     sys.exit(1)
 
 
+# Dashboard connection reused across calls (HTTP keep-alive), so polling
+# doesn't pay a TCP + TLS handshake per request.
+_dash_conn: http.client.HTTPSConnection | None = None
+
+
+def _get_dash_conn() -> http.client.HTTPSConnection:
+    global _dash_conn
+    if _dash_conn is None:
+        _dash_conn = http.client.HTTPSConnection(
+            DASHBOARD_HOST, DASHBOARD_PORT, timeout=10, context=SSL_CTX,
+        )
+    return _dash_conn
+
+
+def _drop_dash_conn() -> None:
+    global _dash_conn
+    if _dash_conn is not None:
+        _dash_conn.close()
+        _dash_conn = None
+
+
 def api_get(path: str) -> dict:
-    url = f"{BASE_URL}{path}"
+    conn = _get_dash_conn()
     try:
-        with urllib.request.urlopen(url, context=SSL_CTX, timeout=10) as resp:
-            return json.loads(resp.read())
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        data = resp.read()
+        if resp.will_close:
+            _drop_dash_conn()
+        if resp.status >= 400:
+            raise RuntimeError(f"HTTP {resp.status}")
+        return orjson.loads(data)
     except Exception as exc:
+        _drop_dash_conn()
         log(f"WARNING: GET {path} failed: {exc}")
         return {}
 
 
+# Spinner patterns in Claude Code:
+#   ✽ Thinking...    (old style)
+#   ⏳ ...           (old style)
+#   * Architecting…  (new style: asterisk + verb + ellipsis on one line)
+#   queued           (message queued)
+#   Churned          (context compaction)
+_BUSY_RE = re.compile(r"✽|⏳|Thinking|Churned|queued|^[ \t]*\* [^\n]*(?:…|\.\.\.)", re.M)
+
+
+def _is_busy(screen: str) -> bool:
+    """Detect if Claude Code is currently processing."""
+    return _BUSY_RE.search(screen) is not None
+
+
 def tmux_send(text: str) -> None:
+    # Short prompts are typed, long ones pasted from a buffer; either way
+    # the commands go down the control connection in one write.
     if len(text) < 800:
+        cmds = [f"send-keys -t {TMUX_SESSION} -l -- {quote(text)}"]
+    else:
+        cmds = [
+            f"set-buffer -b verify -- {quote(text)}",
+            f"paste-buffer -d -b verify -t {TMUX_SESSION}",
+        ]
+    reply = _TMUX.cmd(*cmds, f"send-keys -t {TMUX_SESSION} C-m")
+    if reply is not None:
+        if not reply[0]:
+            raise RuntimeError(f"tmux_send failed: {reply[1]}")
+        return
+
+    # One tmux invocation per prompt: commands are chained with ";" arguments.
+    submit = [";", "send-keys", "-t", TMUX_SESSION, "C-m"]
+    if len(text) < 800:
+        if text.endswith(";"):
+            # tmux would read a trailing ";" as a command separator
+            text = text[:-1] + "\\;"
         subprocess.run(
-            ["tmux", "send-keys", "-t", TMUX_SESSION, "-l", text],
+            ["tmux", "send-keys", "-t", TMUX_SESSION, "-l", text, *submit],
             check=True,
         )
     else:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-            f.write(text)
-            tmp = f.name
-        try:
-            subprocess.run(["tmux", "load-buffer", tmp], check=True)
-            subprocess.run(["tmux", "paste-buffer", "-t", TMUX_SESSION], check=True)
-        finally:
-            os.unlink(tmp)
-    subprocess.run(["tmux", "send-keys", "-t", TMUX_SESSION, "C-m"], check=True)
-
-
-def _is_busy(screen: str) -> bool:
-    """Detect if Claude Code is currently processing."""
-    # Spinner patterns in Claude Code:
-    #   ✽ Thinking...    (old style)
-    #   ⏳ ...           (old style)
-    #   * Architecting…  (new style: asterisk + verb + ellipsis)
-    #   queued           (message queued)
-    #   Churned          (context compaction)
-    busy_markers = ("✽", "⏳", "Thinking", "Churned", "queued")
-    if any(s in screen for s in busy_markers):
-        return True
-    # New spinner: "* <Verb>…" pattern (asterisk + space + capitalized word + ellipsis)
-    for line in screen.split("\n"):
-        stripped = line.strip()
-        if stripped.startswith("* ") and ("…" in stripped or "..." in stripped):
-            return True
-    return False
+        subprocess.run(
+            ["tmux", "load-buffer", "-b", "verify", "-",
+             ";", "paste-buffer", "-d", "-b", "verify", "-t", TMUX_SESSION, *submit],
+            input=text.encode(), check=True,
+        )
 
 
 def wait_idle(timeout: float = 120) -> bool:
     """Wait for Claude Code to finish processing (spinner disappears)."""
     start = time.time()
     started = False
+    # Polls are cheap pipe round-trips over the control client, so start
+    # fast and back off: 100ms growing 1.5x per poll, capped at 1s while
+    # waiting for the spinner and 2s while it is showing.
+    delay = 0.1
     while time.time() - start < min(15, timeout):
-        r = subprocess.run(
-            ["tmux", "capture-pane", "-t", TMUX_SESSION, "-p"],
-            capture_output=True, text=True,
-        )
-        if _is_busy(r.stdout):
+        if _is_busy(_TMUX.capture()):
             started = True
             break
-        time.sleep(1)
+        time.sleep(delay)
+        delay = min(1.0, delay * 1.5)
     if not started:
         time.sleep(3)
+    delay = 0.1
+    prev = None
     while time.time() - start < timeout:
-        r = subprocess.run(
-            ["tmux", "capture-pane", "-t", TMUX_SESSION, "-p"],
-            capture_output=True, text=True,
-        )
-        if not _is_busy(r.stdout) and ("bypass permissions" in r.stdout or ">" in r.stdout):
+        screen = _TMUX.capture()
+        if _is_busy(screen):
+            delay = min(2.0, delay * 1.5)
+        elif "bypass permissions" in screen or ">" in screen:
             return True
-        time.sleep(2)
+        elif screen != prev:
+            # Spinner just cleared; confirm idle quickly
+            delay = 0.1
+        prev = screen
+        time.sleep(delay)
     return False
 
 
-def log_events() -> list[dict]:
-    """Read all structured log events from the proxy log file."""
-    out = []
-    try:
-        with open(LOG_FILE) as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    out.append(json.loads(line))
-                except (json.JSONDecodeError, ValueError):
-                    pass
-    except FileNotFoundError:
-        log(f"WARNING: Log file not found: {LOG_FILE}")
-    return out
+# Incremental parse state for log_events(): byte offset of the first
+# unparsed line, every event parsed so far, the same events grouped by
+# name, and the latest token total and phase snapshot() reports.
+_LOG_CACHE: dict = {}
 
 
-def count_swaps() -> int:
-    """Count swap_executed events — emitted when handle_client_compact calls execute_swap."""
-    return sum(1 for e in log_events() if e.get("event") == "swap_executed")
+def _reset_log_cache() -> None:
+    _LOG_CACHE.update(pos=0, events=[], by_event=defaultdict(list), tokens=0, phase=None)
 
 
-def count_client_compacts() -> int:
-    """Count client compact interception events."""
-    return sum(
-        1 for e in log_events()
-        if e.get("event") == "client_compact_intercepted"
-    )
+_reset_log_cache()
 
+# The only events this script reports on. A line that doesn't contain one
+# of these names (quoted, as JSONRenderer writes them) is skipped without
+# being parsed.
+_WANTED_EVENTS = (
+    b'"request_received"',
+    b'"tokens_updated"',
+    b'"swap_executed"',
+    b'"client_compact_intercepted"',
+    b'"phase_transition"',
+)
 
-def latest_tokens() -> int:
-    for e in reversed(log_events()):
-        if e.get("event") == "tokens_updated" and e.get("total", 0) > 500:
-            return e.get("total", 0)
-    return 0
 
+def log_events() -> list[dict]:
+    """Read the structured log events this script uses from the proxy log file.
 
-def latest_phase() -> str | None:
-    for e in reversed(log_events()):
-        if e.get("event") == "request_received" and "haiku" not in e.get("model", ""):
-            return e.get("phase")
-    return None
+    Only bytes appended since the previous call are parsed, and an
+    unchanged size means no read at all; a file that shrank (truncated
+    or rotated) is re-read from the start. The returned list is shared —
+    callers must not mutate it.
+    """
+    try:
+        # Nothing appended since the last call: skip the open and read
+        if os.stat(LOG_FILE).st_size == _LOG_CACHE["pos"]:
+            return _LOG_CACHE["events"]
+        with open(LOG_FILE, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _LOG_CACHE["pos"]:
+                _reset_log_cache()
+            f.seek(_LOG_CACHE["pos"])
+            chunk = f.read()
+    except FileNotFoundError:
+        log(f"WARNING: Log file not found: {LOG_FILE}")
+        return _LOG_CACHE["events"]
+
+    # Leave a trailing partial line for the next call
+    end = chunk.rfind(b"\n") + 1
+    _LOG_CACHE["pos"] += end
+    events = _LOG_CACHE["events"]
+    by_event = _LOG_CACHE["by_event"]
+    for line in chunk[:end].splitlines():
+        if not any(name in line for name in _WANTED_EVENTS):
+            continue
+        try:
+            e = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        events.append(e)
+        if not isinstance(e, dict):
+            continue
+        name = e.get("event")
+        by_event[name].append(e)
+        if name == "tokens_updated":
+            total = e.get("total", 0)
+            if total > 500:
+                _LOG_CACHE["tokens"] = total
+        elif name == "request_received" and "haiku" not in e.get("model", ""):
+            _LOG_CACHE["phase"] = e.get("phase")
+    return events
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    # swap_executed events — emitted when handle_client_compact calls execute_swap
+    swaps: int
+    # client_compact_intercepted events
+    compacts: int
+    tokens: int
+    phase: str | None
+
+
+def snapshot() -> Snapshot:
+    """All per-round progress values from a single log read."""
+    log_events()
+    by_event = _LOG_CACHE["by_event"]
+    return Snapshot(
+        swaps=len(by_event["swap_executed"]),
+        compacts=len(by_event["client_compact_intercepted"]),
+        tokens=_LOG_CACHE["tokens"],
+        phase=_LOG_CACHE["phase"],
+    )
 
 
 PROMPT_TEMPLATES = [
@@ -202,11 +304,22 @@ FOCUS_AREAS = [
 ]
 
 
+# Template/focus pairings repeat every lcm(len(templates), len(focus areas))
+# rounds; only the round number differs, so each pairing is formatted once
+# and split around {n}.
+_PROMPT_CYCLE = math.lcm(len(PROMPT_TEMPLATES), len(FOCUS_AREAS))
+_PROMPT_PARTS = tuple(
+    PROMPT_TEMPLATES[i % len(PROMPT_TEMPLATES)]
+    .format(n="{n}", focus=FOCUS_AREAS[i % len(FOCUS_AREAS)])
+    .split("{n}", 1)
+    for i in range(_PROMPT_CYCLE)
+)
+
+
 def get_prompt(idx: int) -> str:
     """Generate a unique prompt for each round to prevent 'already answered' responses."""
-    template = PROMPT_TEMPLATES[idx % len(PROMPT_TEMPLATES)]
-    focus = FOCUS_AREAS[idx % len(FOCUS_AREAS)]
-    return template.format(n=idx + 1, focus=focus)
+    head, tail = _PROMPT_PARTS[idx % _PROMPT_CYCLE]
+    return f"{head}{idx + 1}{tail}"
 
 
 def run() -> None:
@@ -227,18 +340,18 @@ def run() -> None:
     log("Seeding conversation...")
     tmux_send("What is 2+2? Reply with just the number.")
     wait_idle(timeout=30)
-    log(f"  tokens={latest_tokens()}")
+    log(f"  tokens={snapshot().tokens}")
 
     prompt_idx = 0
 
     for rnd in range(MAX_ROUNDS):
-        swaps = count_swaps()
-        compacts = count_client_compacts()
-        tokens = latest_tokens()
-        phase = latest_phase()
-        log(f"Round {rnd+1}  swaps={swaps}/{TARGET_SWAPS}  compacts={compacts}  tokens={tokens}  phase={phase}")
+        snap = snapshot()
+        log(
+            f"Round {rnd+1}  swaps={snap.swaps}/{TARGET_SWAPS}  compacts={snap.compacts}"
+            f"  tokens={snap.tokens}  phase={snap.phase}"
+        )
 
-        if swaps >= TARGET_SWAPS:
+        if snap.swaps >= TARGET_SWAPS:
             log(f"Reached {TARGET_SWAPS} swaps!")
             break
 
@@ -247,17 +360,14 @@ def run() -> None:
         if not wait_idle(timeout=ROUND_TIMEOUT):
             log("  WARNING: Timed out waiting for Claude to finish")
             # Check if Claude is still alive
-            r = subprocess.run(
-                ["tmux", "capture-pane", "-t", TMUX_SESSION, "-p"],
-                capture_output=True, text=True,
-            )
-            if "error" in r.stdout.lower() or "fatal" in r.stdout.lower():
-                log(f"  Screen contents: {r.stdout[-500:]}")
+            screen = _TMUX.capture()
+            if "error" in screen.lower() or "fatal" in screen.lower():
+                log(f"  Screen contents: {screen[-500:]}")
                 fail("Claude appears to have errored out")
 
     # Final counts
-    swaps = count_swaps()
-    compacts = count_client_compacts()
+    snap = snapshot()
+    swaps, compacts = snap.swaps, snap.compacts
 
     # Post-swap verification: can Claude still respond?
     log("Verifying Claude still works post-swap...")
@@ -265,14 +375,9 @@ def run() -> None:
     post_ok = wait_idle(timeout=30)
 
     # Collect phase transitions for report
-    transitions = [
-        e for e in log_events()
-        if e.get("event") == "phase_transition"
-    ]
-    client_compact_events = [
-        e for e in log_events()
-        if e.get("event") == "client_compact_intercepted"
-    ]
+    log_events()
+    transitions = _LOG_CACHE["by_event"]["phase_transition"]
+    client_compact_events = _LOG_CACHE["by_event"]["client_compact_intercepted"]
 
     log("=" * 60)
     log("PHASE TRANSITIONS:")
@@ -287,8 +392,9 @@ def run() -> None:
     log(f"  swaps_completed:    {swaps}/{TARGET_SWAPS}  {'PASS' if swaps >= TARGET_SWAPS else 'FAIL'}")
     log(f"  client_compacts:    {compacts}")
     log(f"  post_swap_alive:    {'PASS' if post_ok else 'FAIL'}")
-    log(f"  final_tokens:       {latest_tokens()}")
-    log(f"  final_phase:        {latest_phase()}")
+    final = snapshot()
+    log(f"  final_tokens:       {final.tokens}")
+    log(f"  final_phase:        {final.phase}")
     log("=" * 60)
 
     if swaps >= TARGET_SWAPS and post_ok: